@@ -4,18 +4,20 @@ from accounts.models import Token, User
 # Custom authentication backend for passwordless login using tokens
 class PasswordlessAuthenticationBackend:
     def authenticate(self, request, uid):
-        try:
-            # Look up the token by its unique ID
-            token = Token.objects.get(uid=uid)
-            # Return the user associated with the token's email if they exist
-            return User.objects.get(email=token.email)
-        except User.DoesNotExist:
-            # If no user exists, create a new one with the token's email
-            return User.objects.create(email=token.email)
-        except Token.DoesNotExist:
+        # Look up only the email for the token's unique ID in a single query
+        email = Token.objects.filter(uid=uid).values_list("email", flat=True).first()
+        if email is None:
             # If the token is invalid or missing, return None
             return None
-    
+
+        # Upsert the user in one statement (INSERT ... ON CONFLICT DO NOTHING).
+        # The email is the primary key, so concurrent logins with the same link
+        # cannot race each other into an IntegrityError, and because the User model
+        # has no other columns the instance is complete without reading it back.
+        user = User(email=email)
+        User.objects.bulk_create([user], ignore_conflicts=True)
+        return user
+
     # Retrieves a user by email, or returns None if no such user exists
     def get_user(self, email):
         try:
@@ -41,6 +41,27 @@ class AuthenticateTest(TestCase):
         )
         self.assertEqual(user, existing_user)
 
+    def test_does_not_duplicate_existing_user(self):
+        # Authenticating twice with the same token should leave exactly one user behind
+        token = Token.objects.create(email="edith@example.com")
+        PasswordlessAuthenticationBackend().authenticate(HttpRequest(), token.uid)
+        PasswordlessAuthenticationBackend().authenticate(HttpRequest(), token.uid)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_redeems_token_in_two_queries(self):
+        # One query looks up the token's email and one upserts the user, whether or not the user exists
+        token = Token.objects.create(email="edith@example.com")
+        with self.assertNumQueries(2):
+            PasswordlessAuthenticationBackend().authenticate(HttpRequest(), token.uid)
+        with self.assertNumQueries(2):
+            PasswordlessAuthenticationBackend().authenticate(HttpRequest(), token.uid)
+
+    def test_returned_user_is_saved(self):
+        # The returned instance should behave like one loaded from the database
+        token = Token.objects.create(email="edith@example.com")
+        user = PasswordlessAuthenticationBackend().authenticate(HttpRequest(), token.uid)
+        self.assertFalse(user._state.adding)
+
 
 # Tests for retrieving users by email using the custom authentication backend
 class GetUserTest(TestCase):
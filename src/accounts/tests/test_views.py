@@ -2,12 +2,14 @@
 from unittest import mock  # Tools for creating mock objects to isolate and test behavior in controlled scenarios
 
 # Django
-from django.test import TestCase  # Base test case class for writing unit tests with Django test utilities
+from django.conf import settings  # Access to the configured SESSION_ENGINES
+from django.test import TestCase, override_settings  # Base test case class and per-test settings overrides
 from django.contrib import auth # Django's authentication system (e.g., login, logout, authenticate)
 
 # Local applications
 import accounts.views  # Import the accounts.views module so we can mock the send_mail function defined there
-from accounts.models import Token # Import the Token model used to create and retrieve login tokens
+from accounts.models import Token, User # Import the Token model used to create and retrieve login tokens
+from functional_tests.management.commands.create_session import create_pre_authenticated_session
 
 
 # Tests for the send_login_email view in accounts/views.py
@@ -143,13 +145,44 @@ class LoginViewTest(TestCase):
     @mock.patch("accounts.views.auth")  # Replaces the 'auth' module in accounts.views with a mock object during the test
     def test_calls_django_auth_authenticate(self, mock_auth):
         # Verifies that the login view extracts the token from the URL and passes it to the authentication system
+        # The view is async, so it awaits auth.aauthenticate(); the mock returns None (no such user)
+        mock_auth.aauthenticate = mock.AsyncMock(return_value=None)
         self.client.get("/accounts/login?token=abcd123")
 
-        # Verifies that auth.authenticate() was called with the correct UID
+        # Verifies that auth.aauthenticate() was called with the correct UID
         self.assertEqual(
-            mock_auth.authenticate.call_args,  # Captures the arguments passed to mock_auth.authenticate
-            mock.call(uid="abcd123"),          # Asserts it was called with uid="abcd123"
+            mock_auth.aauthenticate.call_args,  # Captures the arguments passed to mock_auth.aauthenticate
+            mock.call(uid="abcd123"),           # Asserts it was called with uid="abcd123"
         )
 
 
-
+# Tests for the login flow under each supported session engine
+class SessionEngineTest(TestCase):
+
+    def test_login_works_with_every_session_engine(self):
+        # A valid token should log the user in and keep them logged in on the next request
+        for name, engine in settings.SESSION_ENGINES.items():
+            with self.subTest(engine=name), override_settings(SESSION_ENGINE=engine):
+                # SessionMiddleware picks its engine when first loaded, so each engine needs a fresh client
+                self.client = self.client_class()
+                token = Token.objects.create(email=f"{name}@example.com")
+                self.client.get(f"/accounts/login?token={token.uid}")
+                response = self.client.get("/")
+                self.assertEqual(response.context["user"].email, f"{name}@example.com")
+
+    def test_pre_authenticated_sessions_work_with_every_session_engine(self):
+        # The key returned for functional tests can be used directly as the session cookie
+        for name, engine in settings.SESSION_ENGINES.items():
+            with self.subTest(engine=name), override_settings(SESSION_ENGINE=engine):
+                self.client = self.client_class()
+                session_key = create_pre_authenticated_session(f"{name}@example.com")
+                self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+                response = self.client.get("/")
+                self.assertEqual(response.context["user"].email, f"{name}@example.com")
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookie_sessions_do_not_query_the_session_table(self):
+        # Only the user lookup hits the database on a logged-in request
+        self.client.force_login(User.objects.create(email="edith@example.com"))
+        with self.assertNumQueries(1):
+            self.client.get("/")
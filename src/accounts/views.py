@@ -1,3 +1,6 @@
+# Third-party
+from asgiref.sync import sync_to_async  # Runs blocking code from async views in a worker thread
+
 # Django
 from django.shortcuts import redirect, render # Utilities for rendering templates and handling redirects
 from django.core.mail import send_mail # Send email using Django's email backend
@@ -6,14 +9,16 @@ from django.urls import reverse # Utility to get URL paths by view name and argu
 
 # Local applications
 from accounts.models import Token
+from superlists.ratelimit import rate_limit  # Limits how often a client can request login emails
 
 # Handles login email requests
-def send_login_email(request):
+@rate_limit("send_login_email")
+async def send_login_email(request):
     # Get the email address submitted via POST
     email = request.POST["email"]
 
     # Generate a token using the submitted email address
-    token = Token.objects.create(email=email)
+    token = await Token.objects.acreate(email=email)
 
     # Construct a fully qualified url using the token
     url = request.build_absolute_uri(
@@ -23,8 +28,10 @@ def send_login_email(request):
     # Construct a message
     message_body = f"Use this link to log in: \n\n{url}"
 
-    # Send an email containing a login link
-    send_mail(
+    # Send an email containing a login link.
+    # Talking to the SMTP server is slow blocking I/O, so it runs in a thread of its own
+    # (thread_sensitive=False) while the event loop carries on serving other requests
+    await sync_to_async(send_mail, thread_sensitive=False)(
         "Your login link for Superlists",      # Email subject
         message_body,                          # Email body (placeholder)
         "superlistsdalesingh@gmail.com",       # Sender address
@@ -40,11 +47,11 @@ def send_login_email(request):
     # Redirect the user to the home page
     return redirect("/")
 
-def login(request):
+async def login(request):
     # Attempts to authenticate the user using the token from the query string
-    if user := auth.authenticate(uid=request.GET["token"]):  # The walrus operator assigns the result to 'user'
+    if user := await auth.aauthenticate(uid=request.GET["token"]):  # The walrus operator assigns the result to 'user'
         # If authentication succeeds, logs the user in by starting a session
-        auth.login(request, user)
+        await auth.alogin(request, user)
     else:
         # If authentication fails (user is None), adds an error message to be displayed to the user
         messages.error(request, "Invalid login link, please request a new one")
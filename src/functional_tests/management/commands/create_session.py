@@ -1,7 +1,9 @@
+# Standard library
+from importlib import import_module
+
 # Django
 from django.conf import settings
 from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY, get_user_model
-from django.contrib.sessions.backends.db import SessionStore
 from django.core.management.base import BaseCommand
 
 # Get the custom or default User model
@@ -24,14 +26,15 @@ def create_pre_authenticated_session(email):
     # Create a new user with the specified email
     user = User.objects.create(email=email)
     
-    # Create a new session instance using the DB-backed session engine
-    session = SessionStore()
+    # Create a new session instance using whichever session engine is configured,
+    # so the key works as a cookie for db, cached_db and signed_cookies sessions alike
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
     
     # Store the user ID and backend path in the session
     session[SESSION_KEY] = user.pk
     session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
     
-    # Save the session to the database
+    # Persist the session (for signed cookies this signs the data into the key)
     session.save()
     
     # Return the session key so it can be used in a browser cookie
@@ -0,0 +1,19 @@
+# Gunicorn reads this file automatically when it is started from this directory (see the Dockerfile CMD)
+
+# Load Django once in the master process before forking, so workers start with the
+# application already imported and share its memory pages copy-on-write
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Runs in each new worker before it accepts connections, so no request pays for the warm-up.
+    # Database connections aren't part of it: under ASGI each request opens its own.
+    from superlists.warmup import warm_up  # Imported here because Django is set up by the app load
+
+    timings = warm_up()
+    server.log.info(
+        "Worker %s warmed up in %.1f ms (%s)",
+        worker.pid,
+        sum(timings.values()) * 1000,
+        ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items()),
+    )
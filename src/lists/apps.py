@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ListsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lists'
+
+    def ready(self):
+        # Connect the signal handlers that keep cached list fragments up to date
+        from lists import signals  # noqa: F401
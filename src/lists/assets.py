@@ -0,0 +1,30 @@
+# Standard library
+from functools import cache  # The stylesheet choice only changes when the image is rebuilt
+
+# Django
+from django.contrib.staticfiles import finders  # Tells whether build_css has made a purged stylesheet
+from django.templatetags.static import static  # URLs of the static files, hashed in production
+
+# The full Bootstrap stylesheet, relative to the static directories
+SOURCE_STYLESHEET = "bootstrap/css/bootstrap.min.css"
+# The copy `build_css` purges of unused rules, also relative to the static directories
+PURGED_STYLESHEET = "bootstrap/css/bootstrap.purged.min.css"
+
+
+@cache
+def stylesheet():
+    # The stylesheet the pages link to is the purged copy once `build_css` has made one
+    return PURGED_STYLESHEET if finders.find(PURGED_STYLESHEET) else SOURCE_STYLESHEET
+
+
+def critical_static_files():
+    """
+    Returns (name, kind) for the static files every page needs as soon as it starts
+    rendering, where kind is the `as` value to preload it with.
+    """
+    return [(stylesheet(), "style"), ("lists.js", "script")]
+
+
+def preload_links():
+    # Link header values telling the browser (or a proxy sending 103 Early Hints) to fetch them early
+    return [f"<{static(name)}>; rel=preload; as={kind}" for name, kind in critical_static_files()]
@@ -0,0 +1,60 @@
+# Standard library
+import time  # Nanosecond timestamps seed new version counters
+
+# Django
+from django.conf import settings  # Access to LIST_TABLE_CACHE_TIMEOUT
+from django.core.cache import cache  # The default cache holds version counters and rendered fragments
+from django.template.loader import render_to_string  # Renders the table fragment on a cache miss
+from django.utils.safestring import mark_safe  # Marks cached HTML as safe to insert into the page
+
+# Local application
+from superlists.jinja2 import engine_for  # Picks the Django or Jinja2 engine for the table
+from superlists.singleflight import single_flight  # Coalesces concurrent renders of the same table
+
+
+def _version_key(list_id):
+    return f"list-version:{list_id}"
+
+
+def get_list_version(list_id):
+    """
+    Returns the list's current version number, creating one if the cache has none.
+    New counters start from the current time in nanoseconds rather than zero, so a
+    counter that was evicted never comes back with a version it had used before.
+    """
+    return cache.get_or_set(_version_key(list_id), time.time_ns, timeout=None)
+
+
+def bump_list_version(list_id):
+    """
+    Moves the list on to a new version, so its previously cached fragments are never read again.
+    """
+    try:
+        cache.incr(_version_key(list_id))
+    except ValueError:
+        # The counter was never created or has been evicted, so start a fresh one
+        cache.set(_version_key(list_id), time.time_ns(), timeout=None)
+
+
+def list_table_html(list_):
+    """
+    Returns the rendered item table for a list, cached under a key that includes the
+    list's version. Changing a list bumps its version instead of deleting keys, so a
+    hot list page costs one version lookup plus one fragment lookup.
+    """
+    return mark_safe(_render_list_table(list_, get_list_version(list_.id)))
+
+
+# When a popular list's table is not cached yet, only one request renders it and the
+# rest wait for that result. Stale tables are never served: a new version means the
+# list has changed, and the client that changed it must see its own write.
+@single_flight(
+    key=lambda list_, version: f"list-table:{list_.id}:{version}",
+    timeout=settings.LIST_TABLE_CACHE_TIMEOUT,
+)
+def _render_list_table(list_, version):
+    return render_to_string(
+        "includes/list_table.html",
+        {"list": list_},
+        using=engine_for("includes/list_table.html"),
+    )
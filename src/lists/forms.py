@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError  # Raised when form or model
 
 # Local application
 from lists.models import Item  # The Item model representing individual to-do list entries
+from lists.sharding import pinned_to_shard  # Runs the duplicate check in the list's shard
 
 EMPTY_ITEM_ERROR = "You can't have an empty list item"
 
@@ -54,8 +55,10 @@ class ExistingListItemForm(ItemForm):
     def validate_unique(self):
         # Override default unique validation to customize the error message
         try:
-            # Run the model-level unique check (e.g. for unique_together constraints)
-            self.instance.validate_unique()
+            # Run the model-level unique check (e.g. for unique_together constraints).
+            # Its query has no instance to route by, so point it at the list's shard.
+            with pinned_to_shard(self.for_list._state.db):
+                self.instance.validate_unique()
         except ValidationError as e:
             # Replace the default error with a custom duplicate item message
             e.error_dict = {"text": [DUPLICATE_ITEM_ERROR]}
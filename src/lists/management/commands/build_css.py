@@ -0,0 +1,301 @@
+# Standard library
+import gzip  # Reports compressed sizes, which is what browsers actually download
+import re  # Extracts words from sources and names from selectors
+from pathlib import Path  # Reads sources and writes the build output
+
+# Django
+from django.conf import settings  # Access to BASE_DIR and BUILD_DIR
+from django.contrib.staticfiles import finders  # Locates the full Bootstrap stylesheet
+from django.core.management.base import BaseCommand  # Base class for management commands
+
+# Local application
+from lists.assets import PURGED_STYLESHEET, SOURCE_STYLESHEET  # The stylesheet purged, and where the copy goes
+
+# Files that can put class names on the page, relative to BASE_DIR
+CONTENT_GLOBS = [
+    "lists/templates/**/*.html",
+    "lists/jinja2/**/*.html",
+    "lists/static/lists.js",
+    "lists/forms.py",  # Widget attributes such as form-control
+]
+# The templates that draw the first screen of every page (the navbar, messages, header and
+# item form); the rules they need are inlined so the page can paint without waiting for CSS
+CRITICAL_GLOBS = [
+    "lists/templates/base.html",
+    "lists/templates/includes/form.html",
+    "lists/templates/includes/csrf.html",
+    "lists/forms.py",
+]
+
+# What the critical CSS leaves to the purged stylesheet, which arrives before anyone can
+# interact: states that need the pointer or keyboard, and the browser-specific and file
+# input pseudo-elements the first screen doesn't show
+AFTER_FIRST_PAINT_SELECTORS = re.compile(
+    r":(hover|focus|focus-visible|focus-within|active|disabled|checked)\b"
+    r"|::?-(webkit|moz|ms)-|::file-selector-button"
+)
+# Media queries that don't affect the first paint on a screen
+AFTER_FIRST_PAINT_MEDIA = re.compile(r"\bprint\b|prefers-reduced-motion")
+
+# Replaces includes/stylesheets.html; {raw_start}/{raw_end} stop the engine parsing the CSS
+STYLESHEETS_TEMPLATE = """\
+<!-- Generated by `python manage.py build_css`. Critical Bootstrap rules are inlined so the page
+     paints at once; the purged stylesheet loads without blocking rendering and, since it repeats
+     the critical rules, restores their original order once it arrives -->
+<style>{raw_start}{critical_css}{raw_end}</style>
+<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel='stylesheet'">
+<noscript><link href="{href}" rel="stylesheet"></noscript>
+"""
+ENGINES = {
+    "templates": {"load": "{% load static %}\n", "href": "{% static '" + PURGED_STYLESHEET + "' %}",
+                  "raw_start": "{% verbatim %}", "raw_end": "{% endverbatim %}"},
+    "jinja2": {"load": "", "href": "{{ static('" + PURGED_STYLESHEET + "') }}",
+               "raw_start": "{% raw %}", "raw_end": "{% endraw %}"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a copy of Bootstrap without the rules our templates never use, and a "
+        "stylesheets include that inlines the critical rules and loads that copy asynchronously."
+    )
+
+    def handle(self, *args, **options):
+        source_path = finders.find(SOURCE_STYLESHEET)
+        css = Path(source_path).read_text()
+        build_dir = Path(settings.BUILD_DIR)
+
+        purged = purge_css(css, collect_words(CONTENT_GLOBS))
+        critical = purge_css(css, collect_words(CRITICAL_GLOBS), inline=True)
+
+        purged_path = build_dir / "static" / PURGED_STYLESHEET
+        purged_path.parent.mkdir(parents=True, exist_ok=True)
+        purged_path.write_text(purged)
+
+        # Both template engines get an include, each overriding the default one in lists/
+        for engine_dir, syntax in ENGINES.items():
+            include_path = build_dir / engine_dir / "includes" / "stylesheets.html"
+            include_path.parent.mkdir(parents=True, exist_ok=True)
+            include_path.write_text(syntax["load"] + STYLESHEETS_TEMPLATE.format(
+                critical_css=critical,
+                href=syntax["href"],
+                raw_start=syntax["raw_start"],
+                raw_end=syntax["raw_end"],
+            ))
+
+        for label, text in [("bootstrap.min.css", css), ("purged", purged), ("critical (inline)", critical)]:
+            self.stdout.write(f"{label:<20}{len(text.encode()):>9,} bytes{_gzipped_size(text):>9,} gzipped")
+        self.stdout.write(
+            f"Render-blocking CSS before first paint: {_gzipped_size(css):,} gzipped bytes in a separate "
+            f"request before, {_gzipped_size(critical):,} gzipped bytes inline in the page after"
+        )
+
+
+def _gzipped_size(text):
+    return len(gzip.compress(text.encode()))
+
+
+def collect_words(globs):
+    """
+    Returns every word (run of letters, digits, - and _) in the files matching globs.
+    Like PurgeCSS's default extractor this over-collects, which only ever keeps extra rules.
+    """
+    words = set()
+    for pattern in globs:
+        for path in Path(settings.BASE_DIR).glob(pattern):
+            words.update(re.findall(r"[\w-]+", path.read_text()))
+    return words
+
+
+def purge_css(css, words, inline=False):
+    """
+    Returns css without the rules whose selectors need a class, id or attribute that is
+    not in words, then drops the custom properties (--bs-*) and @keyframes that nothing
+    left refers to. Element selectors such as h1 or input are always kept.
+
+    A stylesheet file keeps its @charset and Bootstrap's licence comment; CSS for a
+    <style> element (inline=True) has neither. Inline CSS is only what the first paint
+    needs: element selectors must name elements in words too, and interaction states,
+    print styles and the like (AFTER_FIRST_PAINT_*) are left out.
+    """
+    banner = re.search(r"/\*!.*?\*/", css, re.S)
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    if inline:
+        keep = lambda selector: _selector_is_used(selector, words) and _is_first_paint(selector, words)
+    else:
+        keep = lambda selector: _selector_is_used(selector, words)
+    nodes = _purge_nodes(_parse(css), keep, skip_media=AFTER_FIRST_PAINT_MEDIA if inline else None)
+    _prune_custom_properties(nodes)
+    nodes = _drop_unused_keyframes(nodes)
+    charset = [node for node in nodes if node[0] == "raw" and node[1].startswith("@charset")]
+    nodes = [node for node in nodes if node not in charset]
+    if inline:
+        return _serialize(nodes)
+    # @charset has to come first in the file, before the licence comment
+    return _serialize(charset) + (banner.group() if banner else "") + _serialize(nodes)
+
+
+# The stylesheet is parsed into a small tree of nodes:
+#   ("rule", [selectors], [declarations])
+#   ("group", prelude, [nodes])   for @media, @supports and the like
+#   ("keyframes", name, text)
+#   ("raw", text)                 for statements such as @charset and other at-rules
+
+def _split_top_level(text, separator):
+    # Splits on separator, ignoring separators inside quotes, parentheses and brackets
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote and text[i - 1] != "\\":
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _parse(css):
+    nodes, depth, quote, start, prelude_end = [], 0, None, 0, 0
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != "\\":
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "{":
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                nodes.append(_node(css[start:prelude_end].strip(), css[prelude_end + 1:i]))
+                start = i + 1
+        elif char == ";" and depth == 0:
+            nodes.append(("raw", css[start:i + 1].strip()))
+            start = i + 1
+    return nodes
+
+
+def _node(prelude, body):
+    if re.match(r"@(-\w+-)?keyframes\b", prelude):
+        return ("keyframes", prelude.split()[-1], f"{prelude}{{{body}}}")
+    if prelude.startswith(("@media", "@supports", "@container", "@layer")):
+        return ("group", prelude, _parse(body))
+    if prelude.startswith("@"):
+        return ("raw", f"{prelude}{{{body}}}")
+    return ("rule", _split_top_level(prelude, ","), _split_top_level(body, ";"))
+
+
+def _selector_is_used(selector, words):
+    # Arguments of :not(), :is(), :has() and the like are ignored, which can only keep extra rules
+    while "(" in selector:
+        selector = re.sub(r"\([^()]*\)", "", selector)
+    names = re.findall(r"[.#](-?[_a-zA-Z][\w-]*)", selector)
+    names += re.findall(r"\[\s*([\w-]+)", selector)
+    return all(name in words for name in names)
+
+
+def _is_first_paint(selector, words):
+    if AFTER_FIRST_PAINT_SELECTORS.search(selector):
+        return False
+    # Element names open a compound selector: at the start or after a combinator, once
+    # the insides of brackets and parentheses are out of the way
+    selector = re.sub(r"\[[^\]]*\]", "", selector)
+    while "(" in selector:
+        selector = re.sub(r"\([^()]*\)", "", selector)
+    elements = re.findall(r"(?:^|[\s>+~])([a-zA-Z][\w-]*)", selector)
+    return all(element in words for element in elements)
+
+
+def _purge_nodes(nodes, keep, skip_media=None):
+    kept = []
+    for node in nodes:
+        if node[0] == "rule":
+            selectors = [selector for selector in node[1] if keep(selector)]
+            if selectors:
+                kept.append(("rule", selectors, node[2]))
+        elif node[0] == "group":
+            if skip_media and skip_media.search(node[1]):
+                continue
+            children = _purge_nodes(node[2], keep, skip_media)
+            if children:
+                kept.append(("group", node[1], children))
+        else:
+            kept.append(node)
+    return kept
+
+
+def _rules(nodes):
+    for node in nodes:
+        if node[0] == "rule":
+            yield node
+        elif node[0] == "group":
+            yield from _rules(node[2])
+
+
+def _prune_custom_properties(nodes):
+    # Custom properties are only worth keeping if a kept declaration refers to them with var()
+    declarations = [declaration for rule in _rules(nodes) for declaration in rule[2]]
+    definitions = {}
+    for declaration in declarations:
+        if declaration.startswith("--"):
+            name, _, value = declaration.partition(":")
+            definitions.setdefault(name, []).append(value)
+    referenced = set()
+    pending = [d for d in declarations if not d.startswith("--")]
+    while pending:
+        for name in re.findall(r"var\(\s*(--[\w-]+)", pending.pop()):
+            if name not in referenced:
+                referenced.add(name)
+                # A referenced property's value may refer to further properties
+                pending.extend(definitions.get(name, []))
+    for rule in _rules(nodes):
+        rule[2][:] = [
+            d for d in rule[2]
+            if not d.startswith("--") or d.partition(":")[0] in referenced
+        ]
+
+
+def _drop_unused_keyframes(nodes):
+    text = " ".join(
+        declaration for rule in _rules(nodes) for declaration in rule[2]
+        if declaration.startswith(("animation", "--"))
+    )
+    used = set(re.findall(r"[\w-]+", text))
+
+    def keep(nodes):
+        kept = []
+        for node in nodes:
+            if node[0] == "rule" and not node[2]:
+                continue  # Every declaration was an unused custom property
+            if node[0] == "keyframes" and node[1] not in used:
+                continue
+            if node[0] == "group":
+                children = keep(node[2])
+                if not children:
+                    continue
+                node = ("group", node[1], children)
+            kept.append(node)
+        return kept
+
+    return keep(nodes)
+
+
+def _serialize(nodes):
+    parts = []
+    for node in nodes:
+        if node[0] == "rule":
+            parts.append(f"{','.join(node[1])}{{{';'.join(node[2])}}}")
+        elif node[0] == "group":
+            parts.append(f"{node[1]}{{{_serialize(node[2])}}}")
+        else:
+            parts.append(node[-1])
+    return "".join(parts)
@@ -0,0 +1,16 @@
+# Django
+from django.conf import settings  # Access to LIST_SHARDS
+from django.core.management import call_command  # Runs migrate_online against each shard
+from django.core.management.base import BaseCommand  # Base class for management commands
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies migrations to every list shard besides the default database, which "
+        "`migrate_online` already handles. Does nothing when sharding is off."
+    )
+
+    def handle(self, *args, **options):
+        for alias in settings.LIST_SHARDS[1:]:
+            self.stdout.write(f"Migrating {alias}")
+            call_command("migrate_online", database=alias, verbosity=options["verbosity"], stdout=self.stdout)
@@ -0,0 +1,47 @@
+# Django
+from django.core.management import call_command  # Runs the migrate command
+from django.core.management.base import BaseCommand  # Base class for management commands
+from django.db import DEFAULT_DB_ALIAS  # The database migrated when none is given
+
+# Local application
+from superlists import online_migrations  # Batch settings and progress reports for online rebuilds
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs `migrate` with progress reports from the tables it rebuilds online "
+        "(see superlists/online_migrations.py), so it is safe while the site is serving."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("app_label", nargs="?", help="Only migrate this app.")
+        parser.add_argument("migration_name", nargs="?", help="Migrate the app to this migration.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="The database to migrate.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=online_migrations.BATCH_SIZE,
+            help="Rows copied per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=online_migrations.PAUSE,
+            help="Seconds to wait between batches so other writers get the lock.",
+        )
+
+    def handle(self, *args, **options):
+        migrate_args = [arg for arg in (options["app_label"], options["migration_name"]) if arg]
+        with online_migrations.online_migration_options(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            report=self.stdout.write,
+        ):
+            call_command(
+                "migrate",
+                *migrate_args,
+                database=options["database"],
+                interactive=False,
+                verbosity=options["verbosity"],
+                stdout=self.stdout,
+            )
@@ -0,0 +1,52 @@
+# Django
+from django.conf import settings  # Access to LIST_SHARDS and the cache configuration
+from django.core.management.base import BaseCommand, CommandError  # Base class and error for management commands
+
+# Local application
+from lists import sharding  # The bucket map and move_bucket()
+
+# Cache backends that each process keeps to itself, so the web workers would never
+# hear that the bucket map has changed
+PRIVATE_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Spreads the list buckets evenly over settings.LIST_SHARDS, moving one bucket "
+        "at a time while the site stays up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show which buckets would move without moving them.",
+        )
+
+    def handle(self, *args, **options):
+        if not sharding.is_enabled():
+            raise CommandError("Sharding is off: set DJANGO_LIST_SHARDS to 2 or more.")
+        if settings.CACHES["default"]["BACKEND"] in PRIVATE_CACHES and not options["dry_run"]:
+            raise CommandError(
+                "The web workers learn about moved buckets through the cache, so it must "
+                "be shared with them: set DJANGO_CACHE_PATH."
+            )
+
+        sharding.refresh_shard_map()
+        moved = 0
+        for bucket in range(sharding.BUCKETS):
+            source = sharding.shard_for_bucket(bucket)
+            # Bucket b goes to shard b mod N, so every shard gets the same number of buckets
+            target = settings.LIST_SHARDS[bucket % len(settings.LIST_SHARDS)]
+            if source == target:
+                continue
+            if options["dry_run"]:
+                self.stdout.write(f"Would move bucket {bucket} from {source} to {target}")
+                continue
+            count = sharding.move_bucket(bucket, target)
+            self.stdout.write(f"Moved bucket {bucket} ({count} lists) from {source} to {target}")
+            moved += 1
+        self.stdout.write(f"{moved} buckets moved.")
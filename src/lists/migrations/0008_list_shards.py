@@ -0,0 +1,63 @@
+# Generated by Django 5.1.5 on 2026-10-19 11:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from superlists.online_migrations import RebuildTableOnline
+
+
+class RebuildWhereUsersAreMissing(RebuildTableOnline):
+    """
+    Drops the database constraint on List.owner only in databases without the users
+    table, i.e. the list shards (see lists/sharding.py). Where the users are, the
+    constraint is left in place, so deployments without sharding keep it and their
+    lists table isn't rebuilt. On the shards the table is rebuilt online, so the site
+    keeps writing to it meanwhile.
+    """
+
+    def _holds_users(self, schema_editor, state):
+        user_table = state.apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+        return user_table in schema_editor.connection.introspection.table_names()
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._holds_users(schema_editor, from_state):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._holds_users(schema_editor, to_state):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # RebuildTableOnline commits each batch as it goes
+    atomic = False
+
+    dependencies = [
+        ('lists', '0007_list_owner'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListIdCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ShardBucket',
+            fields=[
+                ('bucket', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('shard', models.CharField(max_length=50)),
+            ],
+        ),
+        RebuildWhereUsersAreMissing('list', [
+            migrations.AlterField(
+                model_name='list',
+                name='owner',
+                field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lists', to=settings.AUTH_USER_MODEL),
+            ),
+        ]),
+    ]
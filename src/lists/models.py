@@ -11,6 +11,10 @@ class List(models.Model):
         blank=True,
         null=True,
         on_delete=models.CASCADE,
+        # Users stay in the default database while sharded lists live in other files, so the
+        # shards can't enforce this reference (the default database keeps its constraint,
+        # see migration 0008)
+        db_constraint=False,
     )
 
     # Returns the URL for this list instance by reversing the URL pattern named 'view_list'.
@@ -18,9 +22,25 @@ class List(models.Model):
     def get_absolute_url(self):
         return reverse('view_list', args=[self.id])
     
+    def save(self, *args, **kwargs):
+        from lists import sharding  # Imported here because lists.sharding imports these models
+        if self._state.adding and self.pk is None and sharding.is_enabled():
+            # With sharding on, a list's id picks its shard, so it must be known before the
+            # insert and unique across shards rather than per database
+            self.pk = sharding.allocate_list_id()
+            kwargs.setdefault("force_insert", True)
+            with sharding.new_list_shard(self.pk) as shard:
+                kwargs["using"] = shard
+                super().save(*args, **kwargs)
+            return
+        super().save(*args, **kwargs)
+
     @property
     def name(self):
-        # Use the text of the first item in the list as its "name"
+        # Use the text of the first item in the list as its "name", unless the query
+        # that loaded the list already fetched it (see lists.sharding.lists_owned_by)
+        if hasattr(self, "first_item_text"):
+            return self.first_item_text
         return self.item_set.first().text
 
 class Item(models.Model):
@@ -33,6 +53,27 @@ class Item(models.Model):
         ordering = ("id",)
         unique_together = ("list", "text")
     
+    def save(self, *args, **kwargs):
+        from lists import sharding  # Imported here because lists.sharding imports these models
+        if sharding.is_enabled():
+            # Items always go in their list's shard, even when saved through Item.objects.create()
+            kwargs["using"] = sharding.shard_for_write(self.list_id)
+        super().save(*args, **kwargs)
+
     # Return the item's text as its string representation for readability in admin, logs, and templates
     def __str__(self):
         return self.text
+
+
+# The two models below only live in the default database (see lists/sharding.py)
+
+class ShardBucket(models.Model):
+    # Which database holds the lists whose id falls in this bucket (id % sharding.BUCKETS).
+    # Buckets without a row are in the default database.
+    bucket = models.PositiveSmallIntegerField(primary_key=True)
+    shard = models.CharField(max_length=50)
+
+
+class ListIdCounter(models.Model):
+    # A single row holding the last id handed to a new list, so ids stay unique across shards
+    value = models.BigIntegerField()
@@ -0,0 +1,301 @@
+# Standard library
+import time  # Nanosecond timestamps seed a new map version
+from contextlib import contextmanager  # Builds the pinned_to_shard() context manager
+from operator import attrgetter  # Sorts lists gathered from several shards by id
+
+# Third-party
+from asgiref.local import Local  # Per-request state that follows a request across threads and tasks
+
+# Django
+from django.conf import settings  # Access to the LIST_SHARDS configuration
+from django.core.cache import cache  # Tells every worker when the bucket map has changed
+from django.core.signals import request_started  # Sent at the start of each request
+from django.db import connections, transaction  # Raw SQL for the id counter, and the move's transactions
+from django.db.models import Count, F, Max, OuterRef, Subquery  # Bucket numbers, per-shard aggregates and first items
+from django.dispatch import receiver  # Decorator for connecting signal handlers
+
+# Local application
+from lists.models import Item, List, ShardBucket  # The sharded models and the bucket map
+
+# Lists are grouped into buckets by id, and each bucket lives in one shard. Moving a
+# bucket only touches the lists in it, so shards can be added without rehashing everything.
+BUCKETS = 256
+
+# Cache key holding the bucket map's version, bumped whenever a bucket moves
+MAP_VERSION_KEY = "list-shard-map-version"
+
+# Models stored in every shard; everything else only lives in the default database
+SHARDED_MODELS = {List, Item}
+
+# This worker's copy of the bucket map: bucket -> database alias
+_map = {"version": object(), "shards": {}}
+
+# The shard that queries with nothing to route them by should use (see pinned_to_shard)
+_pinned = Local()
+
+
+def is_enabled():
+    return len(settings.LIST_SHARDS) > 1
+
+
+def bucket_for(list_id):
+    return list_id % BUCKETS
+
+
+def refresh_shard_map():
+    """
+    Reloads the bucket map from the default database if another process has moved a
+    bucket since this worker last loaded it. Costs one cache read when nothing changed.
+    """
+    version = cache.get(MAP_VERSION_KEY)
+    if version != _map["version"]:
+        _map["shards"] = dict(
+            ShardBucket.objects.using("default").values_list("bucket", "shard")
+        )
+        _map["version"] = version
+
+
+@receiver(request_started)
+def _refresh_for_new_request(**kwargs):
+    if is_enabled():
+        refresh_shard_map()
+
+
+def shard_for_list(list_id):
+    """
+    Returns the alias of the database holding the list, or None when sharding is off
+    (so .using(None) falls back to the usual routing).
+    """
+    if not is_enabled():
+        return None
+    return shard_for_bucket(bucket_for(list_id))
+
+
+def shard_for_read(list_id):
+    """
+    Like shard_for_list(), but returns None for lists in the default database, leaving
+    the choice to the other routers, so the read replica of the default database (see
+    superlists/routers.py) still serves them.
+    """
+    shard = shard_for_list(list_id)
+    return None if shard == "default" else shard
+
+
+def shard_for_write(list_id):
+    """
+    Like shard_for_list(), but checks first that no bucket has moved since the map was
+    loaded, since a write must never go to a list's old shard.
+    """
+    if is_enabled():
+        refresh_shard_map()
+    return shard_for_list(list_id)
+
+
+@contextmanager
+def new_list_shard(list_id):
+    """
+    Yields the shard a new list belongs in, inside a transaction holding that shard's
+    write lock, for the list to be inserted in.
+
+    The shard is checked against the bucket's row in the default database once the lock
+    is held, rather than trusted from this worker's copy of the map. move_bucket() holds
+    the source shard's lock until the bucket's lists are gone and records the new shard
+    before it lets go, so a save that was waiting on that lock goes to the target instead
+    of inserting a list the map no longer points at.
+    """
+    shard = shard_for_write(list_id)
+    while True:
+        # transaction_mode IMMEDIATE: the lock is taken as the block starts
+        with transaction.atomic(using=shard):
+            current = (
+                ShardBucket.objects.using("default")
+                .filter(bucket=bucket_for(list_id))
+                .values_list("shard", flat=True)
+                .first()
+            ) or "default"
+            if current == shard:
+                yield shard
+                return
+        # The bucket moved while this save waited for the lock
+        shard = current
+
+
+def shard_for_bucket(bucket):
+    return _map["shards"].get(bucket, "default")
+
+
+def shard_databases():
+    """
+    Returns every database holding lists, for queries that have to look at all of them:
+    the default database and the shards the bucket map sends buckets to. A shard with no
+    buckets costs no query, and copies left there by an interrupted move aren't shown.
+    """
+    if not is_enabled():
+        return [None]
+    in_use = set(_map["shards"].values())
+    return [alias for alias in settings.LIST_SHARDS if alias == "default" or alias in in_use]
+
+
+def allocate_list_id():
+    """
+    Hands out the next list id from a counter in the default database, so ids are
+    unique across shards. The counter starts above the highest id already used, which
+    covers lists created before sharding was turned on.
+    """
+    with connections["default"].cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO lists_listidcounter (id, value)
+            VALUES (1, (SELECT COALESCE(MAX(id), 0) FROM lists_list) + 1)
+            ON CONFLICT (id) DO UPDATE
+            SET value = MAX(value, (SELECT COALESCE(MAX(id), 0) FROM lists_list)) + 1
+            RETURNING value
+            """
+        )
+        return cursor.fetchone()[0]
+
+
+@contextmanager
+def pinned_to_shard(alias):
+    """
+    Sends list and item queries that carry no instance to route by (such as the
+    unique check behind form validation) to the given shard while the block runs.
+    """
+    previous = getattr(_pinned, "alias", None)
+    _pinned.alias = alias
+    try:
+        yield
+    finally:
+        _pinned.alias = previous
+
+
+class ShardRouter:
+    """
+    Keeps each List and its Items in one of the databases named in settings.LIST_SHARDS,
+    chosen by the list's id through the bucket map. Every other model, and the map itself,
+    stays in "default". Returns None when it has nothing to go on, so the next router
+    (or Django's default) decides.
+    """
+
+    def _shard_for_instance(self, model, instance, lookup=shard_for_list):
+        if model is List and instance.pk is not None:
+            return lookup(instance.pk)
+        if model is Item and instance.list_id is not None:
+            return lookup(instance.list_id)
+        return None
+
+    def _route(self, model, hints):
+        instance = hints.get("instance")
+        if model in SHARDED_MODELS:
+            if instance is not None:
+                if isinstance(instance, tuple(SHARDED_MODELS)):
+                    # Related objects (list.item_set, item.list) are in the instance's shard
+                    return instance._state.db or self._shard_for_instance(model, instance)
+                return None
+            return getattr(_pinned, "alias", None)
+        if instance is not None and isinstance(instance, tuple(SHARDED_MODELS)):
+            # e.g. list.owner: users are only in the default database
+            return "default"
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get("instance")
+        if model in SHARDED_MODELS and isinstance(instance, model):
+            return self._shard_for_instance(model, instance, lookup=shard_for_write)
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A list and its items are always in the same shard, and owners are looked up by key
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == "lists" and model_name in ("list", "item"):
+            return db in settings.LIST_SHARDS
+        return db == "default"
+
+
+def lists_owned_by(email):
+    """
+    Returns the user's lists from every shard, oldest first, with each list's name
+    (the text of its first item) fetched by the same query, so the page costs one
+    query per shard however many lists there are.
+    """
+    first_item = Item.objects.filter(list=OuterRef("pk")).order_by("id").values("text")[:1]
+    lists = []
+    for alias in shard_databases():
+        lists.extend(
+            List.objects.using(alias)
+            .filter(owner_id=email)
+            .annotate(first_item_text=Subquery(first_item))
+        )
+    return sorted(lists, key=attrgetter("id"))
+
+
+def owner_item_stats(email):
+    """
+    Returns the id of the owner's newest item and their number of items in each shard.
+    Item ids are only unique within a database, so the shards are kept apart.
+    """
+    stats = []
+    for alias in shard_databases():
+        latest = Item.objects.using(alias).filter(list__owner_id=email).aggregate(Max("id"), Count("id"))
+        stats.append((alias, latest["id__max"], latest["id__count"]))
+    return tuple(stats)
+
+
+def move_bucket(bucket, target):
+    """
+    Moves every list in a bucket, with its items, to the target shard while the site
+    stays up, and returns the number of lists moved.
+
+    The source shard's write lock is held from the copy until the old rows are deleted,
+    so no item can be added to those lists in between. A worker still using the old map
+    can't lose a write: its item would point at a list that is no longer in the source,
+    so the insert fails its foreign key check instead.
+    """
+    refresh_shard_map()
+    source = shard_for_bucket(bucket)
+    if source == target:
+        return 0
+
+    # transaction_mode IMMEDIATE makes this take the source's write lock straight away
+    with transaction.atomic(using=source):
+        lists = list(
+            List.objects.using(source).alias(bucket=F("id") % BUCKETS).filter(bucket=bucket)
+        )
+        list_ids = [list_.id for list_ in lists]
+        items = list(Item.objects.using(source).filter(list_id__in=list_ids))
+
+        with transaction.atomic(using=target):
+            # Clear out anything left behind by an earlier move that was interrupted
+            # (deleting the lists deletes their items too)
+            List.objects.using(target).filter(id__in=list_ids).delete()
+            List.objects.using(target).bulk_create(lists)
+            # Item ids are only unique within a database, so the copies get new ones
+            # (in the same order, which is the order the list shows them in)
+            for item in items:
+                item.pk = None
+            Item.objects.using(target).bulk_create(items)
+
+        ShardBucket.objects.using("default").update_or_create(
+            bucket=bucket, defaults={"shard": target}
+        )
+        List.objects.using(source).filter(id__in=list_ids).delete()
+
+    # Only announce the new map once it is committed, or a worker could load the old
+    # map under the new version and keep it
+    _bump_map_version()
+    refresh_shard_map()
+    return len(lists)
+
+
+def _bump_map_version():
+    try:
+        cache.incr(MAP_VERSION_KEY)
+    except ValueError:
+        # Like the list versions in lists/caching.py, start from the time rather than zero,
+        # so a counter that was evicted never comes back with a version a worker has seen
+        cache.set(MAP_VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,34 @@
+# Django
+from django.db import transaction  # Defers a second bump until the change is committed
+from django.db.models.signals import post_delete, post_save  # Signals sent after model saves and deletes
+from django.dispatch import receiver  # Decorator for connecting signal handlers
+
+# Local application
+from lists.caching import bump_list_version  # Invalidates a list's cached fragments
+from lists.models import Item, List
+
+# Note: QuerySet.update() and bulk_create() do not send these signals, so code that
+# changes items in bulk must call bump_list_version() itself.
+
+
+def _bump(list_id, using):
+    bump_list_version(list_id)
+    if transaction.get_connection(using).in_atomic_block:
+        # Other connections can't see the change until it commits (e.g. in a group commit),
+        # and one of them may cache the old table under the new version meanwhile, so move on
+        # again once the change is visible
+        transaction.on_commit(lambda: bump_list_version(list_id), using=using)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def item_changed(sender, instance, using, **kwargs):
+    # Any change to an item makes its list's cached table out of date
+    _bump(instance.list_id, using)
+
+
+@receiver(post_save, sender=List)
+def list_created(sender, instance, created, using, **kwargs):
+    # Give new lists a fresh version, in case their id was used before (e.g. after a rollback)
+    if created:
+        _bump(instance.id, using)
@@ -3,4 +3,129 @@ const initialize = (inputSelector) => {
     textInput.oninput = () => {
         textInput.classList.remove("is-invalid");
     };
-};
\ No newline at end of file
+};
+
+const readCookie = (name) => {
+    const match = document.cookie.match(new RegExp(`(?:^|; )${name}=([^;]*)`));
+    return match ? decodeURIComponent(match[1]) : null;
+};
+
+const fetchCsrfToken = async (csrfUrl) => {
+    const response = await fetch(csrfUrl, { credentials: "same-origin" });
+    if (!response.ok) {
+        throw new Error(`${csrfUrl} answered ${response.status}`);
+    }
+    return (await response.json()).token;
+};
+
+// Resolves to true once the fields hold a token, or false if none could be had
+const fillCsrfInputs = async (inputs, csrfUrl) => {
+    try {
+        const token = readCookie("csrftoken") || (await fetchCsrfToken(csrfUrl));
+        inputs.forEach((input) => {
+            input.value = token;
+        });
+        return true;
+    } catch (error) {
+        console.error("Couldn't get a CSRF token", error);
+        return false;
+    }
+};
+
+// Pages served from a shared cache have empty CSRF fields marked with data-deferred-csrf.
+// Fill them from the CSRF cookie if the browser already has one, otherwise ask the server.
+// A form sent before its token arrives would get a 403, so it waits for the token (asking
+// once more if the first request failed) and is then sent again.
+const fillDeferredCsrfTokens = (csrfUrl) => {
+    const inputs = [...document.querySelectorAll("input[data-deferred-csrf]")];
+    if (inputs.length === 0) {
+        return Promise.resolve(true);
+    }
+    let filling = fillCsrfInputs(inputs, csrfUrl);
+    let waiting = false;
+    let retried = false;
+    new Set(inputs.map((input) => input.form).filter(Boolean)).forEach((form) => {
+        // Capturing, so this runs before the form's own handlers (such as the item form's fetch)
+        form.addEventListener("submit", async (event) => {
+            if (!waiting && (retried || inputs.every((input) => input.value))) {
+                return;
+            }
+            event.preventDefault();
+            event.stopImmediatePropagation();
+            if (waiting) {
+                return;  // Already sent again once the token arrives
+            }
+            waiting = true;
+            if (!(await filling)) {
+                retried = true;
+                filling = fillCsrfInputs(inputs, csrfUrl);
+                await filling;
+            }
+            waiting = false;
+            // Without a token the server's 403 page at least says what went wrong
+            form.requestSubmit(event.submitter);
+        }, { capture: true });
+    });
+    return filling;
+};
+
+const showItemError = (form, textInput, message) => {
+    let feedback = form.querySelector(".invalid-feedback");
+    if (!feedback) {
+        feedback = document.createElement("div");
+        feedback.id = "id_text_feedback";
+        feedback.className = "invalid-feedback";
+        textInput.after(feedback);
+    }
+    feedback.textContent = message;
+    textInput.classList.add("is-invalid");
+};
+
+// Sends the item form with fetch and appends the returned row to the table.
+// Anything other than a new row or a validation error (e.g. a CSRF failure, rate
+// limiting or a network error) falls back to an ordinary form submission.
+const submitItemForm = async (form, table, textInput) => {
+    try {
+        const response = await fetch(form.action, {
+            method: "POST",
+            body: new FormData(form),
+            headers: { "X-Requested-With": "XMLHttpRequest" },
+            credentials: "same-origin",
+        });
+        if (response.status === 201) {
+            table.insertAdjacentHTML("beforeend", await response.text());
+            textInput.value = "";
+            textInput.classList.remove("is-invalid");
+            return;
+        }
+        if (response.status === 400) {
+            showItemError(form, textInput, (await response.json()).error);
+            return;
+        }
+    } catch (error) {
+        console.error("Couldn't add the item with fetch", error);
+    }
+    form.submit();
+};
+
+// Progressive enhancement for list pages: without JavaScript (or on the home page,
+// which has no table yet) the form keeps doing a normal POST and redirect
+const initializeItemForm = (formSelector, tableSelector, inputSelector) => {
+    const form = document.querySelector(formSelector);
+    const table = document.querySelector(tableSelector);
+    if (!form || !table) {
+        return;
+    }
+    const textInput = document.querySelector(inputSelector);
+    form.addEventListener("submit", (event) => {
+        event.preventDefault();
+        submitItemForm(form, table, textInput);
+    });
+};
+
+// Installs the service worker that serves repeat visits from the cache (see templates/sw.js)
+const registerServiceWorker = (url) => {
+    if ("serviceWorker" in navigator) {
+        navigator.serviceWorker.register(url);
+    }
+};
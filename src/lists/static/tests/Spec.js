@@ -55,6 +55,102 @@ describe('Superlists tests', () => {
     expect(errorMsg.checkVisibility()).toBe(true);
   })
 
+  it("deferred csrf fields are filled from the csrf endpoint", async () => {
+    const csrfInput = document.createElement("input");
+    csrfInput.setAttribute("data-deferred-csrf", "");
+    testDiv.querySelector("form").appendChild(csrfInput);
+    spyOn(window, "fetch").and.returnValue(
+      Promise.resolve({ ok: true, json: () => Promise.resolve({ token: "a-csrf-token" }) })
+    );
+
+    await fillDeferredCsrfTokens("/csrf");
+
+    expect(window.fetch).toHaveBeenCalledWith("/csrf", jasmine.any(Object));
+    expect(csrfInput.value).toBe("a-csrf-token");
+  })
+
+  it("forms submitted before the csrf token arrives wait for it", async () => {
+    const form = testDiv.querySelector("form");
+    const csrfInput = document.createElement("input");
+    csrfInput.setAttribute("data-deferred-csrf", "");
+    form.appendChild(csrfInput);
+    let respond;
+    spyOn(window, "fetch").and.returnValue(new Promise((resolve) => { respond = resolve; }));
+    const submittedTokens = [];
+    form.addEventListener("submit", (event) => {
+      event.preventDefault();
+      submittedTokens.push(csrfInput.value);
+    });
+
+    const filling = fillDeferredCsrfTokens("/csrf");
+    form.requestSubmit();
+    expect(submittedTokens).toEqual([]);
+    respond({ ok: true, json: () => Promise.resolve({ token: "a-csrf-token" }) });
+    await filling;
+    await new Promise((resolve) => setTimeout(resolve));
+
+    expect(submittedTokens).toEqual(["a-csrf-token"]);
+  })
+
+  it("csrf endpoint errors are caught", async () => {
+    const csrfInput = document.createElement("input");
+    csrfInput.setAttribute("data-deferred-csrf", "");
+    testDiv.querySelector("form").appendChild(csrfInput);
+    spyOn(console, "error");
+    spyOn(window, "fetch").and.returnValue(Promise.reject(new TypeError("Failed to fetch")));
+
+    expect(await fillDeferredCsrfTokens("/csrf")).toBe(false);
+    expect(csrfInput.value).toBe("");
+  })
+
+  it("items submitted with fetch are appended to the table", async () => {
+    const form = testDiv.querySelector("form");
+    const table = document.createElement("table");
+    testDiv.appendChild(table);
+    spyOn(window, "fetch").and.returnValue(
+      Promise.resolve({ status: 201, text: () => Promise.resolve("<tr><td>1: Buy milk</td></tr>") })
+    );
+
+    await submitItemForm(form, table, textInput);
+
+    expect(window.fetch.calls.mostRecent().args[1].headers["X-Requested-With"]).toBe("XMLHttpRequest");
+    expect(table.querySelector("tr").textContent).toBe("1: Buy milk");
+    expect(textInput.value).toBe("");
+    expect(textInput.classList).not.toContain("is-invalid");
+  })
+
+  it("validation errors from a fetch submission are shown", async () => {
+    const form = testDiv.querySelector("form");
+    const table = document.createElement("table");
+    textInput.classList.remove("is-invalid");
+    spyOn(window, "fetch").and.returnValue(
+      Promise.resolve({ status: 400, json: () => Promise.resolve({ error: "A duplicate" }) })
+    );
+
+    await submitItemForm(form, table, textInput);
+
+    expect(errorMsg.textContent).toBe("A duplicate");
+    expect(errorMsg.checkVisibility()).toBe(true);
+  })
+
+  it("fetch errors fall back to an ordinary submission", async () => {
+    const form = testDiv.querySelector("form");
+    const table = document.createElement("table");
+    spyOn(console, "error");
+    spyOn(window, "fetch").and.returnValue(Promise.reject(new TypeError("Failed to fetch")));
+    spyOn(form, "submit");
+
+    await submitItemForm(form, table, textInput);
+
+    expect(form.submit).toHaveBeenCalled();
+  })
+
+  it("csrf endpoint is not called when there are no deferred fields", async () => {
+    spyOn(window, "fetch");
+    await fillDeferredCsrfTokens("/csrf");
+    expect(window.fetch).not.toHaveBeenCalled();
+  })
+
 
 
 });
\ No newline at end of file
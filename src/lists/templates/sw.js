@@ -0,0 +1,92 @@
+// Service worker, rendered by lists.views.service_worker. Static files are served from the
+// cache, and pages are served stale-while-revalidate: a repeat visit renders the copy saved
+// last time at once, while the network fetches the current page for the visit after.
+const VERSION = "{{ version }}";
+// The cache names include the static manifest's hash, so each deploy starts with new caches
+const STATIC_CACHE = `static-${VERSION}`;
+const PAGES_CACHE = `pages-${VERSION}`;
+// The static files every page needs, fetched as soon as the worker installs
+const PRECACHE_URLS = {{ precache_urls|safe }};
+const STATIC_URL = "{{ static_url }}";
+const LOGIN_URL = "{{ login_url }}";
+
+self.addEventListener("install", (event) => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE)
+            .then((cache) => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener("activate", (event) => {
+    // Drop earlier versions' caches, which hold files the current pages no longer link to
+    event.waitUntil(
+        caches.keys()
+            .then((names) => Promise.all(
+                names
+                    .filter((name) => name !== STATIC_CACHE && name !== PAGES_CACHE)
+                    .map((name) => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Only pages the server gave a validator (an ETag) are kept: it leaves one off pages showing
+// flash messages, which must not be shown twice
+const isCacheablePage = (response) =>
+    response.ok && response.type === "basic" && !response.redirected && response.headers.has("ETag");
+
+const staleWhileRevalidate = async (event) => {
+    const cache = await caches.open(PAGES_CACHE);
+    const cached = await cache.match(event.request, { ignoreVary: true });
+    // The page carries an ETag, so this is usually a cheap 304 revalidation
+    const network = fetch(event.request).then(async (response) => {
+        if (isCacheablePage(response)) {
+            await cache.put(event.request, response.clone());
+        } else {
+            await cache.delete(event.request, { ignoreVary: true });
+        }
+        return response;
+    });
+    if (cached) {
+        // Keep the worker alive until the saved copy has been refreshed
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+};
+
+const cacheFirst = async (request) => {
+    const cached = await caches.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(STATIC_CACHE);
+        await cache.put(request, response.clone());
+    }
+    return response;
+};
+
+self.addEventListener("fetch", (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+    if (request.method !== "GET") {
+        // A new list or item makes saved pages out of date, so forget them before it is sent,
+        // and the page the browser is redirected to afterwards comes from the network
+        event.respondWith(caches.delete(PAGES_CACHE).then(() => fetch(request)));
+    } else if (url.pathname.startsWith(STATIC_URL)) {
+        // In production static files have hashed names and never change
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname === LOGIN_URL) {
+        // Logging in changes the user and the CSRF token that saved pages were rendered with
+        // (logging out is a POST, handled above)
+        event.respondWith(caches.delete(PAGES_CACHE).then(() => fetch(request)));
+    } else if (request.mode === "navigate") {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});
@@ -0,0 +1,119 @@
+# Standard library
+import tempfile  # Gives each test its own BUILD_DIR
+from io import StringIO  # Captures the command's report
+from pathlib import Path  # Reads the files the command writes
+
+# Django
+from django.core.management import call_command  # Runs management commands from tests
+from django.template import Template, Context, engines  # Renders the generated includes
+from django.test import SimpleTestCase, override_settings  # Test case without a database, and settings overrides
+
+# Local application
+from lists.assets import PURGED_STYLESHEET
+from lists.management.commands.build_css import purge_css
+
+
+# Tests for removing unused rules from a stylesheet
+class PurgeCssTest(SimpleTestCase):
+    def test_keeps_rules_for_used_classes_only(self):
+        css = ".btn{color:red}.card{color:blue}"
+        self.assertEqual(purge_css(css, {"btn"}), ".btn{color:red}")
+
+    def test_keeps_only_the_used_selectors_of_a_rule(self):
+        css = ".btn,.card,h1{margin:0}"
+        self.assertEqual(purge_css(css, {"btn"}), ".btn,h1{margin:0}")
+
+    def test_needs_every_class_in_a_selector(self):
+        css = ".btn.active{color:red}.btn .icon{color:blue}"
+        self.assertEqual(purge_css(css, {"btn"}), "")
+
+    def test_ignores_classes_inside_not(self):
+        css = ".btn:not(.btn-check){color:red}"
+        self.assertEqual(purge_css(css, {"btn"}), css)
+
+    def test_drops_attribute_selectors_for_attributes_never_used(self):
+        css = "[data-bs-theme=dark]{color:#fff}[hidden]{display:none}"
+        self.assertEqual(purge_css(css, {"hidden"}), "[hidden]{display:none}")
+
+    def test_drops_media_queries_left_empty(self):
+        css = "@media (min-width:576px){.btn{color:red}.card{color:blue}}@media print{.card{display:none}}"
+        self.assertEqual(purge_css(css, {"btn"}), "@media (min-width:576px){.btn{color:red}}")
+
+    def test_drops_custom_properties_nothing_refers_to(self):
+        css = ":root{--bs-a:red;--bs-b:var(--bs-c);--bs-c:blue;--bs-d:green}.btn{color:var(--bs-b)}"
+        self.assertEqual(
+            purge_css(css, {"btn"}),
+            ":root{--bs-b:var(--bs-c);--bs-c:blue}.btn{color:var(--bs-b)}",
+        )
+
+    def test_drops_keyframes_nothing_animates_with(self):
+        css = "@keyframes spin{to{transform:rotate(1turn)}}@keyframes fade{to{opacity:0}}.btn{animation:spin 1s}"
+        self.assertEqual(
+            purge_css(css, {"btn"}),
+            "@keyframes spin{to{transform:rotate(1turn)}}.btn{animation:spin 1s}",
+        )
+
+    def test_does_not_split_on_separators_inside_strings(self):
+        css = '.btn{background:url("data:image/svg+xml;a,{b}")}.card{color:red}'
+        self.assertEqual(purge_css(css, {"btn"}), '.btn{background:url("data:image/svg+xml;a,{b}")}')
+
+    def test_stylesheet_keeps_charset_then_licence(self):
+        css = '@charset "UTF-8";/*! Licence */.btn{color:red}/*# sourceMappingURL=x.map */'
+        self.assertEqual(purge_css(css, {"btn"}), '@charset "UTF-8";/*! Licence */.btn{color:red}')
+        self.assertEqual(purge_css(css, {"btn"}, inline=True), ".btn{color:red}")
+
+    def test_inline_css_needs_the_elements_used_too(self):
+        css = "h1,kbd{margin:0}.btn>span{color:red}*{box-sizing:border-box}"
+        self.assertEqual(purge_css(css, {"btn", "h1"}), css)
+        self.assertEqual(purge_css(css, {"btn", "h1"}, inline=True), "h1{margin:0}*{box-sizing:border-box}")
+
+    def test_inline_css_leaves_out_what_the_first_paint_doesnt_need(self):
+        css = (
+            ".btn{color:red}.btn:hover,.btn:focus-visible{color:blue}.btn::-webkit-file-upload-button{color:green}"
+            "@media print{.btn{display:none}}"
+        )
+        self.assertEqual(purge_css(css, {"btn"}, inline=True), ".btn{color:red}")
+
+
+# Tests for the build_css management command
+class BuildCssCommandTest(SimpleTestCase):
+    def setUp(self):
+        self.build_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(BUILD_DIR=self.build_dir))
+        self.output = StringIO()
+        call_command("build_css", stdout=self.output)
+
+    def test_writes_a_much_smaller_stylesheet_that_keeps_used_classes(self):
+        purged = (self.build_dir / "static" / PURGED_STYLESHEET).read_text()
+        self.assertLess(len(purged), 50_000)
+        self.assertIn(".navbar-brand{", purged)
+        self.assertIn(".is-invalid", purged)  # Only added by lists.js
+        self.assertNotIn(".carousel", purged)
+
+    def test_django_include_inlines_critical_css_and_loads_the_rest_asynchronously(self):
+        include = (self.build_dir / "templates" / "includes" / "stylesheets.html").read_text()
+        html = Template(include).render(Context())
+        self.assertIn("<style>:root{", html)
+        self.assertIn(".navbar{", html)
+        self.assertIn(
+            '<link rel="preload" href="/static/bootstrap/css/bootstrap.purged.min.css" as="style"', html
+        )
+        self.assertIn('<noscript><link href="/static/bootstrap/css/bootstrap.purged.min.css"', html)
+
+    def test_critical_css_is_a_small_part_of_the_purged_stylesheet(self):
+        purged = (self.build_dir / "static" / PURGED_STYLESHEET).read_text()
+        include = (self.build_dir / "templates" / "includes" / "stylesheets.html").read_text()
+        critical = include.split("{% verbatim %}")[1].split("{% endverbatim %}")[0]
+        self.assertLess(len(critical), len(purged) / 2)
+        self.assertNotIn(":hover", critical)
+
+    def test_jinja2_include_renders_the_same_stylesheets(self):
+        include = (self.build_dir / "jinja2" / "includes" / "stylesheets.html").read_text()
+        django_include = (self.build_dir / "templates" / "includes" / "stylesheets.html").read_text()
+        self.assertEqual(
+            engines["jinja2"].from_string(include).render().strip(),
+            Template(django_include).render(Context()).strip(),
+        )
+
+    def test_reports_sizes(self):
+        self.assertIn("gzipped", self.output.getvalue())
@@ -0,0 +1,65 @@
+# Django
+from django.test import TestCase  # Base test case class for writing unit tests
+
+# Local application
+from lists.caching import bump_list_version, get_list_version, list_table_html
+from lists.models import Item, List
+
+
+# Tests for the per-list version counters
+class ListVersionTest(TestCase):
+    def test_version_is_stable_until_bumped(self):
+        list_ = List.objects.create()
+        self.assertEqual(get_list_version(list_.id), get_list_version(list_.id))
+
+    def test_bumping_changes_the_version(self):
+        list_ = List.objects.create()
+        version = get_list_version(list_.id)
+        bump_list_version(list_.id)
+        self.assertNotEqual(get_list_version(list_.id), version)
+
+    def test_saving_or_deleting_an_item_bumps_its_lists_version(self):
+        list_ = List.objects.create()
+        version = get_list_version(list_.id)
+        item = Item.objects.create(list=list_, text="item")
+        after_save = get_list_version(list_.id)
+        self.assertNotEqual(after_save, version)
+        item.delete()
+        self.assertNotEqual(get_list_version(list_.id), after_save)
+
+    def test_other_lists_are_not_bumped(self):
+        list_ = List.objects.create()
+        other_list = List.objects.create()
+        version = get_list_version(other_list.id)
+        Item.objects.create(list=list_, text="item")
+        self.assertEqual(get_list_version(other_list.id), version)
+
+
+# Tests for the cached item table fragment
+class ListTableHtmlTest(TestCase):
+    def test_renders_items(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text="itemey 1")
+        self.assertIn("1: itemey 1", list_table_html(list_))
+
+    def test_second_render_is_served_from_the_cache(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text="itemey 1")
+        list_table_html(list_)
+        with self.assertNumQueries(0):
+            self.assertIn("1: itemey 1", list_table_html(list_))
+
+    def test_new_items_invalidate_the_cached_table(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text="itemey 1")
+        list_table_html(list_)
+        Item.objects.create(list=list_, text="itemey 2")
+        self.assertIn("2: itemey 2", list_table_html(list_))
+
+    def test_hot_list_page_only_queries_for_the_list(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text="itemey 1")
+        self.client.get(f"/lists/{list_.id}/")
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/lists/{list_.id}/")
+        self.assertContains(response, "1: itemey 1")
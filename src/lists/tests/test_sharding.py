@@ -0,0 +1,224 @@
+# Standard library
+from io import StringIO  # Captures the rebalancing command's output
+from unittest import mock, skipUnless  # Fakes the bucket map; skips tests that need real shards
+
+# Django
+from django.conf import settings  # Tells whether the suite is running with several shards
+from django.core.cache import cache  # Holds the bucket map's version
+from django.core.management import call_command  # Runs the rebalancing command
+from django.test import SimpleTestCase, TestCase, override_settings  # Test cases and settings overrides
+
+# Local application
+from accounts.models import User
+from lists import sharding  # The router and helpers under test
+from lists.forms import DUPLICATE_ITEM_ERROR, ExistingListItemForm
+from lists.models import Item, List, ShardBucket
+
+
+@override_settings(LIST_SHARDS=["default", "shard1"])
+@mock.patch.object(sharding, "refresh_shard_map", lambda: None)
+@mock.patch.dict(sharding._map, {"shards": {7: "shard1"}})
+class ShardRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = sharding.ShardRouter()
+
+    def test_buckets_are_ids_modulo_the_bucket_count(self):
+        self.assertEqual(sharding.bucket_for(7), 7)
+        self.assertEqual(sharding.bucket_for(sharding.BUCKETS + 7), 7)
+
+    def test_lists_are_found_through_the_bucket_map(self):
+        self.assertEqual(sharding.shard_for_list(sharding.BUCKETS + 7), "shard1")
+
+    def test_unmapped_buckets_are_in_the_default_database(self):
+        self.assertEqual(sharding.shard_for_list(8), "default")
+
+    def test_reads_of_lists_in_the_default_database_are_left_to_other_routers(self):
+        self.assertIsNone(sharding.shard_for_read(8))
+        self.assertEqual(sharding.shard_for_read(7), "shard1")
+
+    @override_settings(LIST_SHARDS=["default", "shard1", "shard2"])
+    def test_fan_out_skips_shards_without_buckets(self):
+        self.assertEqual(sharding.shard_databases(), ["default", "shard1"])
+
+    @override_settings(LIST_SHARDS=["default"])
+    def test_no_shard_is_chosen_when_sharding_is_off(self):
+        self.assertIsNone(sharding.shard_for_list(7))
+
+    def test_lists_are_written_to_their_shard(self):
+        self.assertEqual(self.router.db_for_write(List, instance=List(id=7)), "shard1")
+
+    def test_items_are_written_to_their_lists_shard(self):
+        item = Item(list_id=7, text="itemey")
+        self.assertEqual(self.router.db_for_write(Item, instance=item), "shard1")
+
+    def test_related_items_are_read_from_the_lists_shard(self):
+        list_ = List(id=8)
+        list_._state.db = "shard1"
+        self.assertEqual(self.router.db_for_read(Item, instance=list_), "shard1")
+
+    def test_owners_are_read_from_the_default_database(self):
+        list_ = List(id=7)
+        list_._state.db = "shard1"
+        self.assertEqual(self.router.db_for_read(User, instance=list_), "default")
+
+    def test_queries_without_hints_are_left_to_other_routers(self):
+        self.assertIsNone(self.router.db_for_read(Item))
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_queries_without_hints_use_the_pinned_shard(self):
+        with sharding.pinned_to_shard("shard1"):
+            self.assertEqual(self.router.db_for_read(Item), "shard1")
+        self.assertIsNone(self.router.db_for_read(Item))
+
+    def test_lists_and_items_are_migrated_on_every_shard(self):
+        self.assertTrue(self.router.allow_migrate("shard1", "lists", "list"))
+        self.assertTrue(self.router.allow_migrate("shard1", "lists", "item"))
+        self.assertTrue(self.router.allow_migrate("default", "lists", "item"))
+
+    def test_everything_else_is_only_migrated_on_the_default_database(self):
+        self.assertFalse(self.router.allow_migrate("shard1", "lists", "shardbucket"))
+        self.assertFalse(self.router.allow_migrate("shard1", "accounts", "user"))
+        self.assertTrue(self.router.allow_migrate("default", "lists", "listidcounter"))
+
+
+class AllocateListIdTest(TestCase):
+    def test_starts_above_the_highest_existing_list_id(self):
+        existing = List.objects.create()
+        self.assertEqual(sharding.allocate_list_id(), existing.id + 1)
+
+    def test_hands_out_a_new_id_each_time(self):
+        first = sharding.allocate_list_id()
+        self.assertEqual(sharding.allocate_list_id(), first + 1)
+
+
+@override_settings(LIST_SHARDS=["default"])
+class ListsOwnedByTest(TestCase):
+    def test_returns_the_owners_lists_named_by_their_first_item(self):
+        owner = User.objects.create(email="a@b.com")
+        first_list = List.objects.create(owner=owner)
+        Item.objects.create(list=first_list, text="first")
+        Item.objects.create(list=first_list, text="second")
+        second_list = List.objects.create(owner=owner)
+        Item.objects.create(list=second_list, text="other")
+        List.objects.create()
+
+        with self.assertNumQueries(1):
+            lists = sharding.lists_owned_by("a@b.com")
+            self.assertEqual(lists, [first_list, second_list])
+            self.assertEqual([list_.name for list_ in lists], ["first", "other"])
+
+
+class RebalanceCommandTest(TestCase):
+    @override_settings(LIST_SHARDS=["default"])
+    def test_refuses_to_run_without_shards(self):
+        with self.assertRaisesMessage(Exception, "Sharding is off"):
+            call_command("rebalance_list_shards")
+
+
+# Run with DJANGO_LIST_SHARDS=3 to create the extra databases these need
+@skipUnless(len(settings.LIST_SHARDS) > 1, "needs DJANGO_LIST_SHARDS set to 2 or more")
+class ShardedListsTest(TestCase):
+    # Not "__all__": the replica mirror's read locks would break the constraint checks at teardown
+    databases = set(settings.LIST_SHARDS)
+
+    def setUp(self):
+        # Start every test from an empty bucket map, and leave this worker's copy of the
+        # map as it was, since the rows it was loaded from are rolled back after each test
+        cache.delete(sharding.MAP_VERSION_KEY)
+        self.addCleanup(cache.delete, sharding.MAP_VERSION_KEY)
+        patcher = mock.patch.dict(sharding._map)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sharding.refresh_shard_map()
+        self.shard = settings.LIST_SHARDS[1]
+
+    def create_list(self, *texts, owner=None):
+        list_ = List.objects.create(owner=owner)
+        for text in texts:
+            Item.objects.create(list=list_, text=text)
+        return list_
+
+    def move(self, list_, target):
+        return sharding.move_bucket(sharding.bucket_for(list_.id), target)
+
+    def test_moving_a_bucket_moves_its_lists_and_items(self):
+        list_ = self.create_list("one", "two")
+        self.assertEqual(self.move(list_, self.shard), 1)
+
+        self.assertFalse(List.objects.using("default").filter(id=list_.id).exists())
+        moved = List.objects.using(self.shard).get(id=list_.id)
+        self.assertEqual([item.text for item in moved.item_set.all()], ["one", "two"])
+        self.assertEqual(ShardBucket.objects.get(bucket=sharding.bucket_for(list_.id)).shard, self.shard)
+
+    def test_new_lists_are_created_in_their_buckets_shard(self):
+        next_id = List.objects.create().id + 1
+        ShardBucket.objects.create(bucket=sharding.bucket_for(next_id), shard=self.shard)
+        sharding._bump_map_version()
+
+        response = self.client.post("/lists/new", data={"text": "A new item"})
+
+        new_list = List.objects.using(self.shard).get()
+        self.assertEqual(new_list.id, next_id)
+        self.assertRedirects(response, f"/lists/{new_list.id}/")
+        self.assertEqual(new_list.item_set.get().text, "A new item")
+
+    def test_new_lists_follow_a_bucket_moved_while_they_waited(self):
+        # This worker's map still says the bucket is in "default", as it would for a save
+        # that was waiting on the default shard's lock while move_bucket() moved the bucket
+        next_id = List.objects.create().id + 1
+        ShardBucket.objects.create(bucket=sharding.bucket_for(next_id), shard=self.shard)
+        self.assertEqual(sharding.shard_for_list(next_id), "default")
+
+        new_list = List.objects.create()
+
+        self.assertEqual(new_list.id, next_id)
+        self.assertEqual(new_list._state.db, self.shard)
+        self.assertFalse(List.objects.using("default").filter(id=next_id).exists())
+
+    def test_view_list_finds_lists_in_other_shards(self):
+        list_ = self.create_list("itemey")
+        self.move(list_, self.shard)
+        response = self.client.get(f"/lists/{list_.id}/")
+        self.assertContains(response, "1: itemey")
+
+    def test_items_are_added_to_lists_in_other_shards(self):
+        list_ = self.create_list("itemey")
+        self.move(list_, self.shard)
+        self.client.post(f"/lists/{list_.id}/", data={"text": "second"})
+        self.assertEqual(Item.objects.using(self.shard).filter(list_id=list_.id).count(), 2)
+        self.assertFalse(Item.objects.using("default").exists())
+
+    def test_duplicate_items_are_caught_in_other_shards(self):
+        list_ = self.create_list("itemey")
+        self.move(list_, self.shard)
+        list_ = List.objects.using(self.shard).get(id=list_.id)
+        form = ExistingListItemForm(for_list=list_, data={"text": "itemey"})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["text"], [DUPLICATE_ITEM_ERROR])
+
+    def test_my_lists_shows_lists_from_every_shard(self):
+        owner = User.objects.create(email="a@b.com")
+        here = self.create_list("stays here", owner=owner)
+        moved = self.create_list("moves", owner=owner)
+        self.move(moved, self.shard)
+        self.client.force_login(owner)
+
+        response = self.client.get("/lists/users/a@b.com/")
+
+        self.assertEqual(response.context["lists"], [here, moved])
+        self.assertContains(response, "stays here")
+        self.assertContains(response, "moves")
+
+    def test_moving_a_bucket_back_replaces_leftover_copies(self):
+        list_ = self.create_list("itemey")
+        self.move(list_, self.shard)
+        self.move(list_, "default")
+        self.assertEqual(Item.objects.using("default").get().text, "itemey")
+        self.assertFalse(List.objects.using(self.shard).exists())
+
+    def test_rebalance_dry_run_moves_nothing(self):
+        list_ = self.create_list("itemey")
+        output = StringIO()
+        call_command("rebalance_list_shards", dry_run=True, stdout=output)
+        self.assertIn("Would move bucket 1 from default to", output.getvalue())
+        self.assertTrue(List.objects.using("default").filter(id=list_.id).exists())
@@ -1,12 +1,15 @@
 # Standard library
-from unittest import skip  # Temporarily skip tests while keeping them in the suite
+import asyncio  # Sends concurrent requests through the async test client
+from unittest import mock, skip  # Fakes a static files manifest; temporarily skips tests
 
 # Django
-from django.test import TestCase  # Base test case class for writing unit tests
+from django.conf import settings  # Access to the session cookie name
+from django.test import Client, TestCase, override_settings  # Test client, base test case and settings overrides
 from django.utils.html import escape  # Escapes special HTML characters for safe rendering
 
 # Local application
 from accounts.models import User 
+from lists import views  # Patched to fake the static files storage
 from lists.models import Item, List
 from lists.forms import (  # Forms and error messages for list item input and validation
     ItemForm,
@@ -28,6 +31,69 @@ class HomePageTest(TestCase):
         response = self.client.get("/")
         self.assertIsInstance(response.context["form"], ItemForm)
 
+    def test_home_page_is_private_by_default(self):
+        # Without the cacheable mode the page carries a CSRF token and no public caching
+        response = self.client.get("/")
+        self.assertRegex(response.content.decode(), r'name="csrfmiddlewaretoken" value="[^"]')
+        self.assertNotIn("public", response.get("Cache-Control", ""))
+
+    @override_settings(STATIC_URL="/assets/")
+    def test_links_to_static_files_through_the_static_storage(self):
+        # Production storage rewrites these URLs to hashed file names, so they must not be hard-coded
+        response = self.client.get("/")
+        self.assertContains(response, 'href="/assets/bootstrap/css/bootstrap.min.css"')
+        self.assertContains(response, 'src="/assets/lists.js"')
+
+
+# Tests for the shared-cache friendly anonymous home page
+@override_settings(CACHEABLE_HOME_PAGE=True)
+class CacheableHomePageTest(TestCase):
+    def test_anonymous_home_page_is_publicly_cacheable(self):
+        response = self.client.get("/")
+        self.assertTemplateUsed(response, "home.html")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn(f"max-age={settings.HOME_PAGE_MAX_AGE}", response["Cache-Control"])
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+        self.assertNotIn("Set-Cookie", str(response.cookies))
+
+    def test_anonymous_home_page_defers_csrf_tokens(self):
+        # Both the new list form and the login form get empty fields for lists.js to fill in
+        response = self.client.get("/")
+        self.assertContains(response, "data-deferred-csrf", count=2)
+        self.assertNotRegex(response.content.decode(), r'name="csrfmiddlewaretoken" value="[^"]')
+
+    def test_anonymous_home_pages_are_identical(self):
+        first = Client().get("/")
+        second = Client().get("/")
+        self.assertEqual(first.content, second.content)
+
+    def test_visitors_with_a_session_get_the_normal_page(self):
+        user = User.objects.create(email="a@b.com")
+        self.client.force_login(user)
+        response = self.client.get("/")
+        self.assertNotIn("public", response.get("Cache-Control", ""))
+        self.assertContains(response, "a@b.com")
+
+    def test_shared_home_page_is_not_re_sent_when_unchanged(self):
+        etag = self.client.get("/")["ETag"]
+        response = Client().get("/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertIn("public", response["Cache-Control"])
+
+    def test_csrf_endpoint_token_can_be_used_to_create_a_list(self):
+        # The token served by the endpoint is accepted when the form is submitted
+        client = Client(enforce_csrf_checks=True)
+        client.get("/")
+        response = client.get("/csrf")
+        self.assertIn("no-cache", response["Cache-Control"])
+        response = client.post(
+            "/lists/new",
+            data={"text": "A new list item", "csrfmiddlewaretoken": response.json()["token"]},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Item.objects.count(), 1)
+
 # Tests for existing list pages and form behavior
 class ListViewTest(TestCase):
     def test_uses_list_template(self):
@@ -128,6 +194,46 @@ class ListViewTest(TestCase):
         self.assertTemplateUsed(response, "list.html")
         self.assertEqual(Item.objects.all().count(), 1)
 
+# Tests for adding items with fetch from lists.js
+class FetchItemSubmissionTest(TestCase):
+    def post_with_fetch(self, mylist, text):
+        return self.client.post(
+            f"/lists/{mylist.id}/",
+            data={"text": text},
+            headers={"x-requested-with": "XMLHttpRequest"},
+        )
+
+    def test_saves_item_and_returns_only_the_new_row(self):
+        mylist = List.objects.create()
+        Item.objects.create(list=mylist, text="itemey 1")
+        response = self.post_with_fetch(mylist, "itemey 2")
+        self.assertEqual(response.status_code, 201)
+        self.assertTemplateUsed(response, "includes/list_row.html")
+        self.assertTemplateNotUsed(response, "list.html")
+        self.assertContains(response, "<td>2: itemey 2</td>", status_code=201, html=True)
+        self.assertEqual(Item.objects.filter(list=mylist).count(), 2)
+
+    def test_returns_validation_errors_as_json(self):
+        mylist = List.objects.create()
+        response = self.post_with_fetch(mylist, "")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": EMPTY_ITEM_ERROR})
+        self.assertEqual(Item.objects.count(), 0)
+
+    def test_returns_duplicate_errors_as_json(self):
+        mylist = List.objects.create()
+        Item.objects.create(list=mylist, text="textey")
+        response = self.post_with_fetch(mylist, "textey")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": DUPLICATE_ITEM_ERROR})
+
+    def test_new_row_appears_when_the_page_is_reloaded(self):
+        mylist = List.objects.create()
+        self.client.get(f"/lists/{mylist.id}/")
+        self.post_with_fetch(mylist, "itemey 1")
+        response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertContains(response, "1: itemey 1")
+
 # Tests for creating new lists
 class NewListTest(TestCase):
     def test_can_save_a_POST_request(self):
@@ -187,3 +293,225 @@ class MyListsTest(TestCase):
         correct_user = User.objects.create(email="a@b.com")
         response = self.client.get("/lists/users/a@b.com/")
         self.assertEqual(response.context["owner"], correct_user)
+
+
+# Tests for ETag validation of the home, list and "My lists" pages
+class ConditionalGetTest(TestCase):
+    def test_list_page_is_not_re_sent_when_unchanged(self):
+        mylist = List.objects.create()
+        Item.objects.create(list=mylist, text="itemey 1")
+        etag = self.client.get(f"/lists/{mylist.id}/")["ETag"]
+        # The 304 is answered before the list or its items are loaded
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/lists/{mylist.id}/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_list_pages_must_be_revalidated(self):
+        mylist = List.objects.create()
+        response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_new_items_change_the_list_etag(self):
+        mylist = List.objects.create()
+        etag = self.client.get(f"/lists/{mylist.id}/")["ETag"]
+        self.client.post(f"/lists/{mylist.id}/", data={"text": "A new item"})
+        response = self.client.get(f"/lists/{mylist.id}/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "A new item")
+
+    def test_list_etag_depends_on_the_user(self):
+        mylist = List.objects.create()
+        etag = self.client.get(f"/lists/{mylist.id}/")["ETag"]
+        self.client.force_login(User.objects.create(email="a@b.com"))
+        response = self.client.get(f"/lists/{mylist.id}/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_etag_when_flash_messages_are_pending(self):
+        mylist = List.objects.create()
+        self.client.get("/accounts/login?token=invalid-token")
+        response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_no_etag_on_post(self):
+        mylist = List.objects.create()
+        response = self.client.post(f"/lists/{mylist.id}/", data={"text": ""})
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_home_page_is_not_re_sent_when_unchanged(self):
+        etag = self.client.get("/")["ETag"]
+        response = self.client.get("/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_home_page_must_be_revalidated(self):
+        response = self.client.get("/")
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_home_etag_depends_on_the_user(self):
+        etag = self.client.get("/")["ETag"]
+        self.client.force_login(User.objects.create(email="a@b.com"))
+        response = self.client.get("/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_my_lists_page_is_not_re_sent_when_unchanged(self):
+        user = User.objects.create(email="a@b.com")
+        Item.objects.create(list=List.objects.create(owner=user), text="itemey 1")
+        etag = self.client.get("/lists/users/a@b.com/")["ETag"]
+        # Only the validator's aggregate query runs; the owner and lists are not loaded
+        with self.assertNumQueries(1):
+            response = self.client.get("/lists/users/a@b.com/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_lists_change_the_my_lists_etag(self):
+        user = User.objects.create(email="a@b.com")
+        Item.objects.create(list=List.objects.create(owner=user), text="itemey 1")
+        etag = self.client.get("/lists/users/a@b.com/")["ETag"]
+        Item.objects.create(list=List.objects.create(owner=user), text="itemey 2")
+        response = self.client.get("/lists/users/a@b.com/", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "itemey 2")
+
+
+# Tests for the hot pages rendered by the Jinja2 templates in lists/jinja2/
+@override_settings(
+    JINJA2_TEMPLATES={"list.html", "my_lists.html", "includes/list_table.html", "includes/list_row.html"}
+)
+class Jinja2TemplatesTest(TestCase):
+    def test_list_page_shows_items_form_and_csrf_token(self):
+        mylist = List.objects.create()
+        Item.objects.create(list=mylist, text="itemey <1>")
+        Item.objects.create(list=mylist, text="itemey 2")
+        response = self.client.get(f"/lists/{mylist.id}/")
+        # Django's engine renders nothing, so its template signals are never sent
+        self.assertTemplateNotUsed(response, "list.html")
+        self.assertContains(response, "<td>1: itemey &lt;1&gt;</td>", html=True)
+        self.assertContains(response, "<td>2: itemey 2</td>", html=True)
+        self.assertContains(response, f'action="/lists/{mylist.id}/"')
+        self.assertRegex(response.content.decode(), r'name="csrfmiddlewaretoken" value="[^"]')
+
+    def test_list_page_shows_validation_errors(self):
+        mylist = List.objects.create()
+        response = self.client.post(f"/lists/{mylist.id}/", data={"text": ""})
+        # Jinja2 escapes the apostrophe as &#39; rather than Django's &#x27;
+        self.assertContains(response, EMPTY_ITEM_ERROR.replace("'", "&#39;"))
+        self.assertContains(response, "is-invalid")
+
+    def test_logged_in_user_gets_my_lists_link_and_logout_form(self):
+        user = User.objects.create(email="a@b.com")
+        self.client.force_login(user)
+        mylist = List.objects.create(owner=user)
+        response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertContains(response, 'href="/lists/users/a@b.com/"')
+        self.assertContains(response, "Logged in as a@b.com")
+
+    def test_list_page_shows_flash_messages(self):
+        mylist = List.objects.create()
+        self.client.post("/accounts/send_login_email", data={"email": "edith@example.com"})
+        response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertContains(response, "Check your email")
+
+    def test_my_lists_links_to_each_list(self):
+        user = User.objects.create(email="a@b.com")
+        mylist = List.objects.create(owner=user)
+        Item.objects.create(list=mylist, text="first item")
+        response = self.client.get("/lists/users/a@b.com/")
+        self.assertContains(response, f'<a href="/lists/{mylist.id}/">first item</a>', html=True)
+
+    @override_settings(STATIC_URL="/assets/")
+    def test_links_to_static_files_through_the_static_storage(self):
+        mylist = List.objects.create()
+        response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertContains(response, 'href="/assets/bootstrap/css/bootstrap.min.css"')
+        self.assertContains(response, 'src="/assets/lists.js"')
+
+    def test_list_page_registers_the_service_worker(self):
+        mylist = List.objects.create()
+        response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertContains(response, 'registerServiceWorker("/sw.js")')
+
+    def test_fetch_submission_returns_row_rendered_by_jinja2(self):
+        mylist = List.objects.create()
+        response = self.client.post(
+            f"/lists/{mylist.id}/",
+            data={"text": "itemey 1"},
+            headers={"x-requested-with": "XMLHttpRequest"},
+        )
+        self.assertTemplateNotUsed(response, "includes/list_row.html")
+        self.assertContains(response, "<td>1: itemey 1</td>", status_code=201, html=True)
+
+
+# Tests for the service worker that serves repeat visits from the browser's cache
+class ServiceWorkerTest(TestCase):
+    def test_is_served_from_the_root_as_javascript(self):
+        response = self.client.get("/sw.js")
+        self.assertEqual(response["Content-Type"], "text/javascript")
+        # Browsers must check for a new version rather than keep an old worker running
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_pages_register_it(self):
+        response = self.client.get("/")
+        self.assertContains(response, 'registerServiceWorker("/sw.js")')
+
+    @override_settings(STATIC_URL="/assets/")
+    def test_precaches_the_static_files_only(self):
+        response = self.client.get("/sw.js")
+        self.assertContains(
+            response,
+            'const PRECACHE_URLS = ["/assets/bootstrap/css/bootstrap.min.css", "/assets/lists.js"];',
+        )
+        self.assertContains(response, 'const STATIC_URL = "/assets/";')
+
+    def test_cache_names_follow_the_static_manifest(self):
+        with mock.patch.object(views.staticfiles_storage, "manifest_hash", "0123abcd", create=True):
+            response = self.client.get("/sw.js")
+        self.assertContains(response, 'const VERSION = "0123abcd";')
+
+    def test_without_a_manifest_the_version_comes_from_the_files(self):
+        first = views._static_version(["lists.js"])
+        self.assertEqual(first, views._static_version(["lists.js"]))
+        self.assertNotEqual(first, views._static_version(["bootstrap/css/bootstrap.min.css"]))
+
+
+# Tests for saving items through the opt-in group-commit writer
+@override_settings(GROUP_COMMIT_WINDOW=0.005)
+class GroupCommitViewsTest(TestCase):
+    async def test_redirected_client_sees_its_new_item(self):
+        mylist = await List.objects.acreate()
+        response = await self.async_client.post(f"/lists/{mylist.id}/", data={"text": "itemey"})
+        self.assertRedirects(response, f"/lists/{mylist.id}/", fetch_redirect_response=False)
+        response = await self.async_client.get(f"/lists/{mylist.id}/")
+        self.assertContains(response, "1: itemey")
+
+    async def test_new_list_is_committed_before_the_redirect(self):
+        response = await self.async_client.post("/lists/new", data={"text": "first"})
+        new_list = await List.objects.aget()
+        self.assertRedirects(response, f"/lists/{new_list.id}/", fetch_redirect_response=False)
+        self.assertEqual(await Item.objects.filter(list=new_list).acount(), 1)
+
+    async def test_concurrent_duplicates_get_the_duplicate_error(self):
+        # Both requests pass validation before either is committed
+        mylist = await List.objects.acreate()
+        responses = await asyncio.gather(*(
+            self.async_client.post(f"/lists/{mylist.id}/", data={"text": "textey"})
+            for _ in range(2)
+        ))
+        self.assertEqual(sorted(response.status_code for response in responses), [200, 302])
+        rejected = next(response for response in responses if response.status_code == 200)
+        self.assertContains(rejected, escape(DUPLICATE_ITEM_ERROR))
+        self.assertEqual(await Item.objects.acount(), 1)
+
+    async def test_concurrent_fetch_duplicates_get_a_json_error(self):
+        mylist = await List.objects.acreate()
+        responses = await asyncio.gather(*(
+            self.async_client.post(
+                f"/lists/{mylist.id}/",
+                data={"text": "textey"},
+                headers={"x-requested-with": "XMLHttpRequest"},
+            )
+            for _ in range(2)
+        ))
+        self.assertEqual(sorted(response.status_code for response in responses), [201, 400])
+        rejected = next(response for response in responses if response.status_code == 400)
+        self.assertEqual(rejected.json(), {"error": DUPLICATE_ITEM_ERROR})
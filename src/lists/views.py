@@ -1,53 +1,237 @@
+# Standard library
+import hashlib  # Hashes the parts of an ETag, and static files for the service worker's version
+import json  # Writes the service worker's list of URLs to cache as a JavaScript array
+from pathlib import Path  # Reads static files when there is no manifest to take a version from
+
+# Third-party
+from asgiref.sync import sync_to_async  # Runs ORM-touching code from async views in a worker thread
+
 # Django
+from django.conf import settings  # Access to the CACHEABLE_HOME_PAGE switch
+from django.contrib import messages  # Flash messages, which make a page unsuitable for a 304
+from django.contrib.messages.storage.cookie import CookieStorage  # Knows the name of the flash message cookie
+from django.contrib.staticfiles import finders  # Locates static files in development
+from django.contrib.staticfiles.storage import staticfiles_storage  # The manifest of hashed static files
+from django.templatetags.static import static  # URLs of the static files the service worker caches
+from django.db import IntegrityError  # Raised when a concurrent request saved the same item first
+from django.http import HttpResponse, JsonResponse  # Response classes for the static home page and CSRF endpoint
+from django.middleware.csrf import get_token  # Returns (and if needed creates) the request's CSRF token
+from django.template.loader import render_to_string  # Renders a template without a request context
+from django.utils.cache import get_conditional_response, patch_cache_control  # 304s and Cache-Control directives
 from django.utils.html import escape  # Escapes special HTML characters to prevent injection
+from django.utils.http import quote_etag  # Turns the shared home page's hash into an ETag header value
 from django.shortcuts import redirect, render  # Utilities for rendering templates and handling redirects
+from django.urls import reverse  # URLs of the pages the service worker treats specially
+from django.views.decorators.cache import cache_control, never_cache  # Control how responses are cached
 
 # Local application
 from accounts.models import User
-from lists.models import Item, List  # Models representing to-do items and lists
-from lists.forms import ItemForm, ExistingListItemForm  # Forms for creating and validating list items
+from lists.caching import get_list_version, list_table_html  # Per-list versions and cached item tables
+from lists.models import List  # Model representing to-do lists
+from lists.forms import DUPLICATE_ITEM_ERROR, ItemForm, ExistingListItemForm  # Forms for list items
+from lists.assets import critical_static_files  # The static files every page needs
+from lists.sharding import lists_owned_by, owner_item_stats, shard_for_list, shard_for_read  # Finds lists across shards
+from superlists.conditional import async_condition  # Answers conditional GETs with 304 Not Modified
+from superlists.groupcommit import group_commit  # Batches concurrent inserts into one transaction
+from superlists.jinja2 import engine_for  # Picks the Django or Jinja2 engine for each template
+from superlists.ratelimit import rate_limit  # Limits how often a client can create new lists
+
+# The views are async so that, under the ASGI server, a request waiting on I/O does not
+# hold a worker. The ORM's async methods (aget, acreate, ...) are used where they exist.
+# Form validation, saving and template rendering can query the database lazily (unique
+# checks, item_set.all in templates, the session behind request.user), which Django only
+# allows from synchronous code, so those steps are run through sync_to_async.
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(
+        request, template_name, context, using=engine_for(template_name)
+    )
+
 
+def _is_shared_home_page(request):
+    return settings.CACHEABLE_HOME_PAGE and not _has_per_user_state(request)
+
+def _home_etag(request):
+    # The shared page's ETag comes from its content instead (see home_page), since the
+    # visitor's identity and CSRF cookie would add "Vary: Cookie"
+    if _is_shared_home_page(request):
+        return None
+    return _page_etag(request, "home")
+
+# View function for rendering the home page. Like the list pages, it has an ETag, so
+# browsers revalidate it cheaply and the service worker keeps a copy
+@async_condition(etag_func=_home_etag)
+async def home_page(request):
+    if _is_shared_home_page(request):
+        # Render without the request so the page holds no session data or CSRF token,
+        # which makes it identical for every anonymous visitor and safe to share between them
+        html = render_to_string("home.html", {"form": ItemForm(), "deferred_csrf": True})
+        response = HttpResponse(html)
+        patch_cache_control(response, public=True, max_age=settings.HOME_PAGE_MAX_AGE)
+        response["ETag"] = quote_etag(hashlib.sha256(html.encode()).hexdigest()[:32])
+        return get_conditional_response(request, etag=response["ETag"], response=response)
 
-# View function for rendering the home page
-def home_page(request):
     # Always pass an empty form to the home page
-    return render(request, "home.html", {"form": ItemForm()})
+    response = await _render(request, "home.html", {"form": ItemForm()})
+    # The page shows the user's email and CSRF token, so only the browser may keep it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def _has_per_user_state(request):
+    # Looks only at cookies: touching request.session or request.user would add "Vary: Cookie"
+    return (
+        settings.SESSION_COOKIE_NAME in request.COOKIES
+        or CookieStorage.cookie_name in request.COOKIES
+    )
+
+@never_cache
+async def csrf(request):
+    # Hands out a CSRF token (setting the CSRF cookie as a side effect) for pages served without one
+    return JsonResponse({"token": get_token(request)})
+
+# Serves the script from the root URL, so the worker's scope covers every page. Browsers look
+# for a new version at least daily, and straight away when they load a page after a deploy.
+@cache_control(no_cache=True)
+async def service_worker(request):
+    static_files = _service_worker_static_files()
+    # Pages aren't precached: they are kept as they are visited, with their validators
+    precache_urls = [static(name) for name in static_files]
+    script = render_to_string("sw.js", {
+        "version": _static_version(static_files),
+        "precache_urls": json.dumps(precache_urls),
+        "static_url": settings.STATIC_URL,
+        "login_url": reverse("login"),
+    })
+    return HttpResponse(script, content_type="text/javascript")
+
+def _service_worker_static_files():
+    return [name for name, kind in critical_static_files()]
+
+def _static_version(static_files):
+    """
+    Returns the hash of the static files manifest, which changes whenever a deploy changes
+    any static file. In development there is no manifest and files keep their names, so
+    the contents of the files the service worker caches are hashed instead.
+    """
+    manifest_hash = getattr(staticfiles_storage, "manifest_hash", None)
+    if manifest_hash:
+        return manifest_hash
+    digest = hashlib.sha256()
+    for name in static_files:
+        digest.update(Path(finders.find(name)).read_bytes())
+    return digest.hexdigest()[:12]
+
+def _page_etag(request, *parts):
+    """
+    Builds an ETag from the parts that identify a page's content, plus the visitor's
+    identity and CSRF cookie, since every page embeds the user's email and a CSRF token.
+    Returns None (no validator) for unsafe methods and for pages showing flash messages.
+    """
+    if request.method not in ("GET", "HEAD") or messages.get_messages(request):
+        return None
+    # get_token() creates the CSRF secret on a first visit, so the page rendered for
+    # that visit and the requests that follow share one validator
+    get_token(request)
+    parts += (request.user.pk, request.META["CSRF_COOKIE"])
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+def _list_etag(request, list_id):
+    # The list's version changes whenever one of its items is saved or deleted
+    return _page_etag(request, "list", list_id, get_list_version(list_id))
+
+def _my_lists_etag(request, email):
+    # Every list starts with an item, so the owner's newest item id and item count (in
+    # each shard) change whenever a list is created or an item is added to or removed from one
+    return _page_etag(request, "my_lists", email, owner_item_stats(email))
+
+# Browsers must revalidate every time, and get a 304 with no body when nothing has changed
+@cache_control(private=True, no_cache=True)
+@async_condition(etag_func=_list_etag)
+async def view_list(request, list_id):
+    # Retrieve the list from the database (or shard) holding it using the provided list_id
+    our_list = await List.objects.using(shard_for_read(list_id)).aget(id=list_id)
 
-def view_list(request, list_id):
-    # Retrieve the list from the database using the provided list_id
-    our_list = List.objects.get(id=list_id)
-    
     if request.method == "POST":
         # Bind form to submitted data and associate it with the current list
         form = ExistingListItemForm(for_list=our_list, data=request.POST)
-        
-        if form.is_valid():
+
+        if _is_fetch(request):
+            # lists.js submitted the form with fetch: reply with just the new row or the error
+            return await _fetch_item_response(request, our_list, form)
+
+        # Validation checks for duplicates in the database
+        if await sync_to_async(form.is_valid)() and await _save_item(form):
             # Save the new item to the existing list and redirect to the same list page
-            form.save()
             return redirect(our_list)
     else:
         # Re-initialize the unbound form (relevant on initial GET or failed POST)
         form = ExistingListItemForm(for_list=our_list)
 
-    # Render the list page with the current list and form (bound or unbound)
-    return render(request, "list.html", {"list": our_list, "form": form})
+    # Render the list page with the current list, its cached item table and the form (bound or unbound)
+    list_table = await sync_to_async(list_table_html)(our_list)
+    return await _render(
+        request,
+        "list.html",
+        {"list": our_list, "list_table": list_table, "form": form},
+    )
+
+def _is_fetch(request):
+    # lists.js marks the requests it sends with fetch, so they can get fragments instead of pages
+    return request.headers.get("X-Requested-With") == "XMLHttpRequest"
+
+async def _fetch_item_response(request, our_list, form):
+    if await sync_to_async(form.is_valid)() and (item := await _save_item(form)):
+        # The row is numbered like the rest of the table, by the item's position in the list
+        # (items are ordered by id), which items saved after it can't change
+        number = await our_list.item_set.filter(id__lte=item.id).acount()
+        row = await sync_to_async(render_to_string)(
+            "includes/list_row.html",
+            {"item": item, "number": number},
+            request=request,
+            using=engine_for("includes/list_row.html"),
+        )
+        return HttpResponse(row, status=201)
+    return JsonResponse({"error": form.errors["text"][0]}, status=400)
 
-def new_list(request):
+async def _save_item(form):
+    """
+    Saves a validated ExistingListItemForm through the group-commit writer and returns the
+    item. If a concurrent request saved the same item first (both passed validation before
+    either committed), adds the duplicate error to the form and returns None instead.
+    """
+    try:
+        # Batched with the other items going to the same shard
+        return await group_commit(form.save, using=shard_for_list(form.for_list.id))
+    except IntegrityError:
+        form.add_error("text", DUPLICATE_ITEM_ERROR)
+        return None
+
+@rate_limit("new_list")
+async def new_list(request):
     # Build a form instance using POST data from the request
     form = ItemForm(data=request.POST)
 
-    if form.is_valid():
-        # Create a new List and link a new Item to it using the form
-        nulist = List.objects.create()
-        if request.user.is_authenticated:
-            nulist.owner = request.user
-            nulist.save()
-        form.save(for_list=nulist)
-        return redirect(nulist)
+    if await sync_to_async(form.is_valid)():
+        # Create a new List, owned by the user if they are logged in, and link a new Item to it using the form
+        user = await request.auser()
+
+        # With sharding on, the list and its item go to the new list's shard in a transaction
+        # of their own (see List.save), so only the id allocation joins the batch
+        def create_list():
+            nulist = List.objects.create(owner=user if user.is_authenticated else None)
+            form.save(for_list=nulist)
+            return nulist
+
+        return redirect(await group_commit(create_list))
     else:
         # On validation failure, re-render the home page with the invalid form and its errors
-        return render(request, "home.html", {"form": form})
+        return await _render(request, "home.html", {"form": form})
 
-def my_lists(request, email):
-    owner = User.objects.get(email=email)
-    return render(request, "my_lists.html", {"owner": owner})
+@cache_control(private=True, no_cache=True)
+@async_condition(etag_func=_my_lists_etag)
+async def my_lists(request, email):
+    owner = await User.objects.aget(email=email)
+    # The owner's lists may be spread over several shards, so owner.lists can't find them all
+    lists = await sync_to_async(lists_owned_by)(email)
+    return await _render(request, "my_lists.html", {"owner": owner, "lists": lists})
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'superlists.settings')
 
 application = get_asgi_application()
+
+# Imported once Django is set up, since it reads the settings and static files
+from superlists.middleware import EarlyHintsMiddleware  # noqa: E402
+
+# Sends 103 Early Hints on servers that support them
+application = EarlyHintsMiddleware(application)
@@ -0,0 +1,175 @@
+# Standard library
+import os  # Detects forks so each worker process opens its own connection
+import pickle  # Serialises cached values that are not plain integers
+import sqlite3  # The cache lives in a single SQLite file shared by every worker
+import threading  # Each thread keeps its own connection
+import time  # Expiry and last-access timestamps
+
+# Django
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache  # Base class for cache backends
+
+# Reads refresh an entry's last-access time at most this often, so most
+# cache hits stay pure reads and LRU order is accurate to about a second
+ACCESS_RESOLUTION = 1.0
+
+# Counting the entries scans the table, so each process only counts them after this
+# fraction of MAX_ENTRIES writes; the cache can overshoot MAX_ENTRIES by as much per worker
+CULL_CHECK_FRACTION = 0.01
+
+
+class SQLiteCache(BaseCache):
+    """
+    A cache stored in one WAL-mode SQLite file, so every gunicorn worker in the
+    container reads and writes the same entries, and they survive worker restarts.
+
+    Entries expire after their timeout. Once there are more than MAX_ENTRIES,
+    expired entries are removed first and then the least recently used
+    1/CULL_FREQUENCY of the rest. The entries are counted every MAX_ENTRIES *
+    CULL_CHECK_FRACTION writes rather than on every one.
+
+    Configure it with the file path as LOCATION:
+
+        CACHES = {
+            "default": {
+                "BACKEND": "superlists.cache.SQLiteCache",
+                "LOCATION": "/tmp/superlists-cache.sqlite3",
+            }
+        }
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._cull_interval = max(1, int(self._max_entries * CULL_CHECK_FRACTION))
+        # Approximate under concurrent writes from several threads, which only moves the next count
+        self._writes_since_cull = 0
+
+    def _connection(self):
+        # Connections can't be shared across threads or inherited through a fork
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            # isolation_level=None leaves every statement in autocommit mode
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, accessed REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _encode(self, value):
+        # Integers are stored natively so incr() can update them in SQL; everything else is pickled
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _decode(self, value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        # Insert the entry, or overwrite an existing one only if it has expired, in one atomic statement
+        cursor = self._connection().execute(
+            "INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = excluded.value, expires = excluded.expires, accessed = excluded.accessed "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, self._encode(value), self.get_backend_timeout(timeout), now, now),
+        )
+        added = cursor.rowcount > 0
+        if added:
+            self._cull()
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute(
+            "SELECT value, expires, accessed FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            connection.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return self._decode(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, self._encode(value), self.get_backend_timeout(timeout), time.time()),
+        )
+        self._cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE cache SET expires = ?, accessed = ? "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        # A single UPDATE ... RETURNING makes the increment atomic across workers
+        row = self._connection().execute(
+            "UPDATE cache SET value = value + ?, accessed = ? "
+            "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?) "
+            "RETURNING value",
+            (delta, now, key, now),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Connections are reused across requests, so there is nothing to do at the end of one
+        pass
+
+    def _cull(self):
+        self._writes_since_cull += 1
+        if self._writes_since_cull < self._cull_interval:
+            return
+        self._writes_since_cull = 0
+        connection = self._connection()
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count <= self._max_entries:
+            return
+        connection.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self._max_entries:
+            # Drop the least recently used fraction of the remaining entries
+            connection.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (count // self._cull_frequency if self._cull_frequency else count,),
+            )
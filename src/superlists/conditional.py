@@ -0,0 +1,32 @@
+# Standard library
+from functools import wraps  # Preserves the wrapped view's name and docstring
+
+# Third-party
+from asgiref.sync import sync_to_async  # Runs the ETag function where the ORM is allowed
+
+# Django
+from django.utils.cache import get_conditional_response  # Builds 304/412 responses from validators
+from django.utils.http import quote_etag  # Turns an ETag value into a quoted header value
+
+
+def async_condition(etag_func):
+    """
+    The async-view counterpart of django.views.decorators.http.condition(etag_func=...).
+
+    Django's decorator calls etag_func directly even for async views, so it may not
+    touch the ORM or the session. Here etag_func runs in a worker thread, so it can
+    use both. A matching If-None-Match gets a 304 without calling the view.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def inner(request, *args, **kwargs):
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            if etag is not None and request.method in ("GET", "HEAD"):
+                response.headers.setdefault("ETag", etag)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,81 @@
+# Standard library
+import asyncio  # Collects concurrent writes on the worker's event loop
+import weakref  # Forgets the pending batch of an event loop that has been closed
+
+# Third-party
+from asgiref.sync import sync_to_async  # Runs the batch's transaction in the ORM's sync thread
+
+# Django
+from django.conf import settings  # Access to GROUP_COMMIT_WINDOW
+from django.db import transaction  # The shared transaction and the savepoint around each write
+
+# Event loop -> {database alias: list of (operation, future) waiting for that database's next commit}
+_batches = weakref.WeakKeyDictionary()
+# Flushes in progress, referenced so they are not garbage collected before they finish
+_flushes = set()
+
+
+async def group_commit(operation, using=None):
+    """
+    Runs operation(), a function that writes to the database `using` (the default database
+    when None), and returns its result.
+
+    With settings.GROUP_COMMIT_WINDOW set (in seconds), calls for the same database made
+    on the same event loop within that window run together in one transaction, so
+    concurrent requests share one write lock and one sync to disk instead of taking turns.
+    Each operation runs in its own savepoint: one that fails (e.g. with an IntegrityError
+    for a duplicate) raises in its own caller while the others still commit. The call
+    returns only once the transaction has committed, so a client redirected afterwards
+    reads its own write.
+
+    With list sharding, pass the shard the operation writes to: writes to any other
+    database commit on their own rather than with the batch.
+    """
+    window = settings.GROUP_COMMIT_WINDOW
+    if not window:
+        return await sync_to_async(operation)()
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    batches = _batches.setdefault(loop, {})
+    batch = batches.get(using)
+    if batch is None:
+        # This is the first write of a new batch, so commit the batch once the window has passed
+        batch = batches[using] = []
+        loop.call_later(window, _start_flush, loop, using)
+    batch.append((operation, future))
+    return await future
+
+
+def _start_flush(loop, using):
+    task = loop.create_task(_flush(_batches[loop].pop(using), using))
+    _flushes.add(task)
+    task.add_done_callback(_flushes.discard)
+
+
+async def _flush(batch, using):
+    try:
+        results = await sync_to_async(_commit)([operation for operation, _ in batch], using)
+    except Exception as error:
+        # The transaction as a whole failed (e.g. the write lock timed out), so every caller gets the error
+        results = [(None, error)] * len(batch)
+    for (_, future), (value, error) in zip(batch, results):
+        if future.cancelled():
+            continue  # The client went away; its write has still been made
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+
+def _commit(operations, using=None):
+    # Returns a (result, exception) pair for each operation
+    results = []
+    with transaction.atomic(using=using):
+        for operation in operations:
+            try:
+                with transaction.atomic(using=using):
+                    results.append((operation(), None))
+            except Exception as error:
+                results.append((None, error))
+    return results
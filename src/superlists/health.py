@@ -0,0 +1,112 @@
+# Standard library
+import json  # Body of the readiness response
+
+# Third-party
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async  # Async/sync adapters
+
+# Django
+from django.core.cache import caches  # Caches the readiness check reaches
+from django.db import connections  # Databases the readiness check queries
+from django.http import HttpResponse  # The probes' plain responses
+
+# Local application
+from superlists import warmup  # Templates, URLs and caches to warm before taking traffic
+
+# Answered by HealthCheckMiddleware before any other middleware runs
+LIVENESS_PATH = "/healthz"
+READINESS_PATH = "/readyz"
+
+
+def check_databases():
+    # One trivial query per database, so a locked or missing file shows up here
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+
+def check_caches():
+    for cache in caches.all():
+        cache.set("readiness-probe", 1, timeout=10)
+        if cache.get("readiness-probe") != 1:
+            raise RuntimeError(f"{cache!r} didn't keep a value")
+
+
+def warm_up():
+    for step in (warmup.warm_templates, warmup.warm_urls, warmup.warm_caches):
+        step()
+    # Left unmarked if a step fails, so the next check tries again
+    warmup.mark_warm()
+
+
+def readiness():
+    """
+    Warms the worker the first time it is asked, then checks that every database and
+    cache answers. Returns (ready, {check name: "ok" or the error}).
+    """
+    checks = [("databases", check_databases), ("caches", check_caches)]
+    if not warmup.is_warm():
+        # Usually done already: gunicorn.conf.py warms each worker as it starts
+        checks.insert(0, ("warm-up", warm_up))
+    results = {}
+    for name, check in checks:
+        try:
+            check()
+            results[name] = "ok"
+        except Exception as error:
+            results[name] = f"{type(error).__name__}: {error}"
+    return all(result == "ok" for result in results.values()), results
+
+
+class HealthCheckMiddleware:
+    """
+    Answers the probes a deploy or load balancer sends, ahead of every other middleware:
+
+    - /healthz says the process is up and handling requests, and touches nothing else,
+    - /readyz warms the worker on its first call, then returns 200 once the databases
+      and caches answer, or 503 with the failing checks.
+
+    Going first means the probes never load a session, set a CSRF cookie or count
+    towards a rate limit, and they work when addressed by IP or "localhost", which
+    ALLOWED_HOSTS would otherwise reject.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path == LIVENESS_PATH:
+            return self.alive()
+        if request.path == READINESS_PATH:
+            return self.ready(*readiness())
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path == LIVENESS_PATH:
+            return self.alive()
+        if request.path == READINESS_PATH:
+            # The checks query the databases, which Django only allows from sync code
+            return self.ready(*await sync_to_async(readiness)())
+        return await self.get_response(request)
+
+    def alive(self):
+        return self._no_store(HttpResponse("ok", content_type="text/plain"))
+
+    def ready(self, is_ready, results):
+        response = HttpResponse(
+            json.dumps({"ready": is_ready, "checks": results}),
+            content_type="application/json",
+            status=200 if is_ready else 503,
+        )
+        return self._no_store(response)
+
+    def _no_store(self, response):
+        response["Cache-Control"] = "no-store"
+        return response
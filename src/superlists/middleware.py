@@ -0,0 +1,291 @@
+# Standard library
+import re  # Matches the content types worth compressing
+import secrets  # Random file names that pad streamed gzip headers
+import struct  # Packs the streamed gzip trailer
+import zlib  # Streams gzip output chunk by chunk
+
+# Third-party
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async  # Async/sync adapters
+from whitenoise.middleware import WhiteNoiseMiddleware  # Serves static files from Django
+
+try:
+    import brotli  # Brotli compression; without it responses are only gzipped
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Django
+from django.conf import settings  # Static URL, which the early hints skip
+from django.utils.cache import patch_vary_headers  # Adds Accept-Encoding to the Vary header
+from django.utils.text import compress_string  # Gzips whole bodies, with Django's BREACH padding
+
+# Local application
+from lists.assets import preload_links  # Link header values for the critical static files
+
+# Bodies shorter than this aren't worth compressing: the gzip header and checksum alone
+# take 18 bytes (same threshold as Django's GZipMiddleware)
+MIN_COMPRESS_SIZE = 200
+
+# Brotli's quality runs from 0 to 11. 11 is for files compressed once at build time
+# (as WhiteNoise does for static files); 5 compresses pages about as fast as gzip's
+# default level and still a little smaller.
+BROTLI_QUALITY = 5
+
+# Gzipped bodies carry up to this many random bytes in the header's file name field,
+# so their length says less about the content (same as Django's GZipMiddleware)
+MAX_RANDOM_BYTES = 100
+
+# Text formats. Images, fonts and archives are compressed already.
+COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/|application/(json|javascript|xml|manifest\+json)|image/svg\+xml)"
+)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise's middleware only runs synchronously, which under ASGI would make
+    every request hop to a thread and back just to pass through it. This version
+    also runs in async mode: static files are served from a worker thread and all
+    other requests go straight on to the next (async) handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # Tells Django this middleware instance returns a coroutine when called
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Development only: looking files up means touching the filesystem
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+def accepted_encoding(accept_encoding):
+    """
+    Picks the encoding to compress a response with from an Accept-Encoding header:
+    "br" if the client takes it, otherwise "gzip", otherwise None. Codings with q=0
+    are refused, and "*" stands for any coding not listed.
+    """
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if qualities.get(encoding, qualities.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class _StreamCompressor:
+    # Compresses a stream of chunks, flushing after each one so every chunk of the page
+    # reaches the browser as soon as the view produces it
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self.compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+            self.compress_chunk = lambda data: self.compressor.process(data) + self.compressor.flush()
+            self.finish = self.compressor.finish
+        else:
+            # A raw deflate stream (negative wbits) inside a gzip header and trailer
+            # built here, so the header can carry the same padding as whole bodies
+            self.compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self.header = _padded_gzip_header()
+            self.crc = 0
+            self.size = 0
+            self.compress_chunk = self._gzip_chunk
+            self.finish = self._gzip_finish
+
+    def _gzip_chunk(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        output = self.header + self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.header = b""
+        return output
+
+    def _gzip_finish(self):
+        # The trailer is the CRC-32 and length (mod 2**32) of the uncompressed data
+        trailer = struct.pack("<II", self.crc, self.size & 0xFFFFFFFF)
+        return self.header + self.compressor.flush() + trailer
+
+    def compress_sync(self, chunks):
+        for chunk in chunks:
+            if chunk:
+                yield self.compress_chunk(chunk)
+        yield self.finish()
+
+    async def compress_async(self, chunks):
+        async for chunk in chunks:
+            if chunk:
+                yield self.compress_chunk(chunk)
+        yield self.finish()
+
+
+def _padded_gzip_header():
+    # Magic number, deflate, the FNAME flag, no modification time, no extra flags, unknown
+    # OS, then a NUL-terminated file name of random length, as Django's padding writes
+    name = secrets.token_hex(secrets.randbelow(MAX_RANDOM_BYTES // 2 + 1)).encode()
+    return b"\x1f\x8b\x08\x08" + b"\x00\x00\x00\x00" + b"\x00\xff" + name + b"\x00"
+
+
+def _compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=MAX_RANDOM_BYTES)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with Brotli or gzip, whichever the browser prefers (Brotli
+    when it takes both), including StreamingHttpResponse bodies, sync or async, which
+    are compressed chunk by chunk as they are sent.
+
+    Responses are left alone when they are tiny, already have a Content-Encoding
+    (such as WhiteNoise's precompressed static files), aren't text, or ask for
+    Cache-Control: no-transform.
+
+    Compressing pages that reflect user input next to a secret opens them to BREACH.
+    The secret on these pages is the CSRF token, which Django masks differently in
+    every response. Gzipped bodies, whole or streamed, also get up to MAX_RANDOM_BYTES
+    of random padding in the gzip header, as with Django's GZipMiddleware. Brotli has
+    no header field to pad, so Brotli bodies rely on the token masking alone.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not self._compressible(response):
+            return response
+        # Caches must keep the compressed and uncompressed copies apart
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compressor = _StreamCompressor(encoding)
+            if response.is_async:
+                response.streaming_content = compressor.compress_async(response.streaming_content)
+            else:
+                response.streaming_content = compressor.compress_sync(response.streaming_content)
+            # The compressed length isn't known until the stream ends
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < MIN_COMPRESS_SIZE:
+                return response
+            compressed = _compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The compressed body is a different set of bytes, so a strong ETag would be
+        # wrong for it. A weak one still matches in If-None-Match (see conditional.py).
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def _compressible(self, response):
+        return (
+            response.status_code not in (204, 206, 304)
+            and not response.has_header("Content-Encoding")
+            and "no-transform" not in response.get("Cache-Control", "")
+            and COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")) is not None
+        )
+
+
+class PreloadLinksMiddleware:
+    """
+    Adds a Link header to pages naming the static files every page needs, so the
+    browser starts fetching them before it has parsed the <head>, and so a proxy or
+    CDN in front of the site can send them ahead of the page as 103 Early Hints.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.status_code == 200 and response.get("Content-Type", "").startswith("text/html"):
+            response.headers.setdefault("Link", ", ".join(preload_links()))
+        return response
+
+
+class EarlyHintsMiddleware:
+    """
+    ASGI middleware that sends a 103 Early Hints response with the preload links
+    before the request reaches Django, so the browser fetches the stylesheet and
+    script while the view is still querying the database.
+
+    Only servers that offer the ASGI "http.response.early_hint" extension can send
+    them (Hypercorn does, Uvicorn doesn't yet); with other servers this passes the
+    request straight through and the Link header on the page does the job.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "GET"
+            and "http.response.early_hint" in scope.get("extensions", {})
+            and "text/html" in dict(scope["headers"]).get(b"accept", b"").decode("latin-1")
+            and not scope["path"].startswith(settings.STATIC_URL)
+        ):
+            await send({
+                "type": "http.response.early_hint",
+                "links": [link.encode("latin-1") for link in preload_links()],
+            })
+        await self.app(scope, receive, send)
@@ -0,0 +1,288 @@
+# Standard library
+import copy  # Copies the new model's fields onto the shadow model
+import time  # Pauses between batches and measures the copy rate
+from contextlib import contextmanager  # Builds the online_migration_options() context manager
+
+# Django
+from django.apps.registry import Apps  # A registry of its own for the shadow model
+from django.db import OperationalError, transaction  # Index name clashes, and the batches' transactions
+from django.db.backends.ddl_references import Statement  # Index and constraint SQL queued by the schema editor
+from django.db.migrations.operations import RenameField  # Column renames, which the copy has to follow
+from django.db.migrations.operations.base import Operation  # Base class for migration operations
+
+# Rows copied per transaction. Each batch holds the write lock while it runs, so smaller
+# batches make writers wait less at the cost of a longer migration.
+BATCH_SIZE = 1000
+# Seconds to sleep between batches, so queued writers get the lock
+PAUSE = 0.05
+
+# Set by the migrate_online command for the duration of a run
+_options = {"batch_size": BATCH_SIZE, "pause": PAUSE, "report": None}
+
+
+@contextmanager
+def online_migration_options(batch_size=BATCH_SIZE, pause=PAUSE, report=None):
+    """
+    Sets the batch size, the pause between batches and a report(message) callback
+    for the online rebuilds run inside the block.
+    """
+    previous = dict(_options)
+    _options.update(batch_size=batch_size, pause=pause, report=report)
+    try:
+        yield
+    finally:
+        _options.update(previous)
+
+
+def _report(message):
+    if _options["report"] is not None:
+        _options["report"](message)
+
+
+class RebuildTableOnline(Operation):
+    """
+    Applies operations that change one model (AddField, AddIndex, AlterUniqueTogether, ...)
+    by rebuilding its table while the site keeps reading and writing it.
+
+    SQLite can't alter most things in place, so Django rebuilds the table in one
+    transaction that holds the write lock for the whole copy. Instead, this:
+
+    1. creates a shadow table with the new schema, indexes included,
+    2. adds triggers to the old table that repeat every insert, update and delete
+       on the shadow table,
+    3. copies the existing rows across in batches of BATCH_SIZE, each in its own short
+       transaction, pausing between batches so other writers get the lock,
+    4. swaps the tables in one short transaction.
+
+    Wrap the operations a migration would run, and set `atomic = False` on the migration
+    so the batches can commit:
+
+        class Migration(migrations.Migration):
+            atomic = False
+            operations = [
+                RebuildTableOnline("item", [migrations.AddIndex("item", models.Index(...))]),
+            ]
+
+    Other databases run the wrapped operations as usual. An index from Meta.indexes that
+    already exists under the same name can't be built on the shadow table, so it is
+    rebuilt after the swap, holding the write lock while it is built.
+    """
+
+    def __init__(self, model_name, operations):
+        self.model_name = model_name
+        self.operations = operations
+        super().__init__()
+
+    @property
+    def model_name_lower(self):
+        return self.model_name.lower()
+
+    def deconstruct(self):
+        return (self.__class__.__qualname__, [self.model_name, self.operations], {})
+
+    def describe(self):
+        changes = "; ".join(operation.describe() for operation in self.operations)
+        return f"Rebuild {self.model_name} online: {changes}"
+
+    @property
+    def migration_name_fragment(self):
+        return "_".join(operation.migration_name_fragment for operation in self.operations)
+
+    def state_forwards(self, app_label, state):
+        for operation in self.operations:
+            operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._rebuilds_online(schema_editor):
+            for operation in self.operations:
+                new_state = from_state.clone()
+                operation.state_forwards(app_label, new_state)
+                operation.database_forwards(app_label, schema_editor, from_state, new_state)
+                from_state = new_state
+            return
+        old_model = from_state.apps.get_model(app_label, self.model_name)
+        new_model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, new_model):
+            rebuild_table(schema_editor, old_model, new_model, self._renamed_fields())
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._rebuilds_online(schema_editor):
+            # Work out the state before each operation, then undo them last to first
+            states = [to_state]
+            for operation in self.operations[:-1]:
+                states.append(states[-1].clone())
+                operation.state_forwards(app_label, states[-1])
+            for operation, state in reversed(list(zip(self.operations, states))):
+                after = state.clone()
+                operation.state_forwards(app_label, after)
+                operation.database_backwards(app_label, schema_editor, after, state)
+            return
+        old_model = from_state.apps.get_model(app_label, self.model_name)
+        new_model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, new_model):
+            renamed = {new: old for old, new in self._renamed_fields().items()}
+            rebuild_table(schema_editor, old_model, new_model, renamed)
+
+    def _rebuilds_online(self, schema_editor):
+        if schema_editor.connection.vendor != "sqlite" or schema_editor.collect_sql:
+            # sqlmigrate shows the SQL of the wrapped operations
+            return False
+        if schema_editor.connection.in_atomic_block:
+            raise ValueError(
+                "RebuildTableOnline commits as it goes: set atomic = False on the migration."
+            )
+        return True
+
+    def _renamed_fields(self):
+        # Old field name -> new field name, so renamed columns are copied across
+        return {
+            operation.old_name: operation.new_name
+            for operation in self.operations
+            if isinstance(operation, RenameField)
+        }
+
+
+def rebuild_table(schema_editor, old_model, new_model, renamed_fields=None):
+    """
+    Rebuilds old_model's table with new_model's schema as described in RebuildTableOnline.
+    Each field is copied from the old field with the same name, or the one renamed_fields
+    (old name -> new name) says it was renamed from; new fields get their default.
+    """
+    connection = schema_editor.connection
+    table = old_model._meta.db_table
+    shadow = f"{table}__online"
+    quote = schema_editor.quote_name
+    renamed_from = {new: old for old, new in (renamed_fields or {}).items()}
+
+    # Each column of the new table, and where its value comes from: a column of the old
+    # table, or for a new field its default as an SQL literal
+    old_columns = {field.name: field.column for field in old_model._meta.local_concrete_fields}
+    columns, sources = [], []
+    for field in new_model._meta.local_concrete_fields:
+        columns.append(quote(field.column))
+        old_column = old_columns.get(renamed_from.get(field.name, field.name))
+        if old_column is not None:
+            sources.append((quote(old_column), True))
+        else:
+            sources.append((schema_editor.quote_value(schema_editor.effective_default(field)), False))
+    pk = quote(old_model._meta.pk.column)
+    column_list = ", ".join(columns)
+
+    def row_values(row=None):
+        # The new table's values for a row of the old one (NEW or OLD inside a trigger)
+        return ", ".join(
+            f"{row}.{source}" if row and is_column else source for source, is_column in sources
+        )
+
+    # Start over if an earlier attempt was interrupted
+    _drop_triggers(schema_editor, table)
+    schema_editor.execute(f"DROP TABLE IF EXISTS {quote(shadow)}")
+
+    schema_editor.create_model(_shadow_model(new_model, shadow))
+    _create_shadow_indexes(schema_editor, shadow)
+
+    for event, body in [
+        ("INSERT", f"INSERT OR REPLACE INTO {quote(shadow)} ({column_list}) VALUES ({row_values('NEW')});"),
+        ("UPDATE", f"DELETE FROM {quote(shadow)} WHERE {pk} = OLD.{pk}; "
+                   f"INSERT OR REPLACE INTO {quote(shadow)} ({column_list}) VALUES ({row_values('NEW')});"),
+        ("DELETE", f"DELETE FROM {quote(shadow)} WHERE {pk} = OLD.{pk};"),
+    ]:
+        schema_editor.execute(
+            f"CREATE TRIGGER {quote(_trigger_name(table, event))} AFTER {event} ON {quote(table)} "
+            f"BEGIN {body} END"
+        )
+
+    try:
+        _copy_rows(connection, table, shadow, pk, column_list, row_values())
+    except Exception:
+        _drop_triggers(schema_editor, table)
+        schema_editor.execute(f"DROP TABLE IF EXISTS {quote(shadow)}")
+        raise
+
+    # The swap: the only step that holds the write lock for more than a batch
+    with transaction.atomic(using=connection.alias):
+        _drop_triggers(schema_editor, table)
+        schema_editor.execute(f"DROP TABLE {quote(table)}")
+        schema_editor.alter_db_table(new_model, shadow, table)
+    _report(f"Swapped in the rebuilt {table}")
+
+
+def _shadow_model(model, db_table):
+    # A copy of the model's fields, indexes and constraints stored in db_table, built the
+    # way Django's SQLite schema editor builds the new table when it remakes one
+    meta = model._meta
+    attrs = copy.deepcopy({field.name: field for field in meta.local_concrete_fields})
+    attrs["__module__"] = model.__module__
+    attrs["Meta"] = type("Meta", (), {
+        "app_label": meta.app_label,
+        "db_table": db_table,
+        "unique_together": meta.unique_together,
+        "indexes": meta.indexes,
+        "constraints": meta.constraints,
+        "apps": Apps(),
+    })
+    return type(f"Online{meta.object_name}", model.__bases__, attrs)
+
+
+def _create_shadow_indexes(schema_editor, shadow):
+    """
+    Builds the shadow table's indexes now, while it is empty, rather than at the end of
+    the migration, where building them would hold the write lock for as long as it takes.
+    """
+    for statement in list(schema_editor.deferred_sql):
+        if isinstance(statement, Statement) and statement.references_table(shadow):
+            try:
+                schema_editor.execute(statement)
+            except OperationalError as error:
+                if "already exists" not in str(error):
+                    raise
+                # A named index still on the old table; left to run after the swap
+                continue
+            schema_editor.deferred_sql.remove(statement)
+
+
+def _copy_rows(connection, table, shadow, pk, column_list, values):
+    quote = connection.ops.quote_name
+    # Rows added after this point reach the shadow table through the insert trigger
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*), MIN({pk}) - 1, MAX({pk}) FROM {quote(table)}")
+        total, position, last_pk = cursor.fetchone()
+    _report(f"Copying {total} rows of {table} in batches of {_options['batch_size']}")
+    table, shadow = quote(table), quote(shadow)
+
+    copied, started = 0, time.monotonic()
+    while copied < total:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            # Where this batch ends, so the next one starts after it
+            cursor.execute(
+                f"SELECT MAX({pk}), COUNT(*) FROM (SELECT {pk} FROM {table} "
+                f"WHERE {pk} > %s AND {pk} <= %s ORDER BY {pk} LIMIT %s)",
+                [position, last_pk, _options["batch_size"]],
+            )
+            batch_end, batch_size = cursor.fetchone()
+            if not batch_size:
+                # Rows were deleted while copying
+                break
+            # OR IGNORE: a row a trigger has already copied is newer than this copy of it
+            cursor.execute(
+                f"INSERT OR IGNORE INTO {shadow} ({column_list}) SELECT {values} FROM {table} "
+                f"WHERE {pk} > %s AND {pk} <= %s",
+                [position, batch_end],
+            )
+        copied += batch_size
+        position = batch_end
+        elapsed = time.monotonic() - started
+        _report(
+            f"  {copied}/{total} rows ({copied / max(total, 1):.0%}), "
+            f"{copied / elapsed if elapsed else 0:.0f} rows/s"
+        )
+        time.sleep(_options["pause"])
+
+
+def _trigger_name(table, event):
+    return f"{table}__online_{event.lower()}"
+
+
+def _drop_triggers(schema_editor, table):
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {schema_editor.quote_name(_trigger_name(table, event))}")
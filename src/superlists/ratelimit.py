@@ -0,0 +1,169 @@
+# Standard library
+import time  # Monotonic clock for refilling token buckets
+from functools import wraps  # Preserves the wrapped view's name and docstring
+
+# Third-party
+from asgiref.sync import iscoroutinefunction, sync_to_async  # Async view wrapper, and a thread for cache calls
+
+# Django
+from django.conf import settings  # Access to the RATE_LIMITS configuration
+from django.core.cache import caches  # Optional shared cache used instead of the in-process store
+from django.http import HttpResponse  # Used to build the 429 response
+
+TOO_MANY_REQUESTS_ERROR = "Too many requests, please try again later."
+
+# Rate units accepted in RATE_LIMITS, e.g. "10/m" means 10 requests per minute
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+# Functions that extract the bucket key for each kind of limit from a request
+KEY_FUNCTIONS = {
+    "ip": lambda request: request.META.get("REMOTE_ADDR", ""),
+    "email": lambda request: request.POST.get("email", "").strip().lower(),
+    "global": lambda request: "",
+}
+
+# Once the in-process store holds this many buckets, idle ones are pruned
+MAX_BUCKETS = 10_000
+
+# Cache key of the shared store's generation, which is part of every counter's key
+GENERATION_KEY = "ratelimit:generation"
+
+
+def parse_rate(rate):
+    """
+    Converts a rate string such as "10/m" into a (capacity, period in seconds) tuple.
+    """
+    count, unit = rate.split("/")
+    return int(count), PERIODS[unit]
+
+
+class LocalTokenBucketStore:
+    """
+    Keeps a token bucket per key in a plain dict belonging to this process.
+    No locks are taken: each check is a single dict read and a single dict write,
+    so under contention a handful of extra requests may slip through, which is an
+    acceptable trade for never blocking a request thread on the limiter.
+    """
+
+    def __init__(self):
+        # Maps bucket key -> (tokens remaining, time of last refill)
+        self.buckets = {}
+
+    def consume(self, key, capacity, period):
+        now = time.monotonic()
+        tokens, last_refill = self.buckets.get(key, (capacity, now))
+        # Refill the bucket in proportion to the time elapsed since the last request
+        tokens = min(capacity, tokens + (now - last_refill) * capacity / period)
+        allowed = tokens >= 1
+        self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+        if len(self.buckets) > MAX_BUCKETS:
+            self.prune(now, period)
+        return allowed
+
+    def prune(self, now, period):
+        # Buckets untouched for a whole period have refilled completely, so dropping them changes nothing
+        for key, (_, last_refill) in list(self.buckets.items()):
+            if now - last_refill > period:
+                self.buckets.pop(key, None)
+
+    def clear(self):
+        self.buckets.clear()
+
+
+class CacheWindowStore:
+    """
+    Counts requests per fixed time window in a shared Django cache, so all workers
+    enforce one limit. add() and incr() are atomic on shared backends such as
+    memcached and Redis, and nothing is written to the application database.
+
+    The cache may hold other entries (such as the list versions), so clearing the
+    store moves its counters to a new generation instead of emptying the cache; the
+    old counters expire with their windows.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def consume(self, key, capacity, period):
+        cache = caches[self.alias]
+        generation = cache.get_or_set(GENERATION_KEY, 0, timeout=None)
+        window_key = f"ratelimit:{generation}:{key}:{int(time.time() // period)}"
+        # Start the window's counter at zero if this is its first request
+        cache.add(window_key, 0, timeout=period)
+        try:
+            count = cache.incr(window_key)
+        except ValueError:
+            # The counter expired between add() and incr(), so this is the first request in a new window
+            cache.set(window_key, 1, timeout=period)
+            count = 1
+        return count <= capacity
+
+    def clear(self):
+        cache = caches[self.alias]
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        cache.incr(GENERATION_KEY)
+
+
+_local_store = LocalTokenBucketStore()
+
+
+def get_store():
+    # Use the shared cache when one is configured, otherwise the in-process buckets
+    alias = getattr(settings, "RATE_LIMIT_CACHE", None)
+    return CacheWindowStore(alias) if alias else _local_store
+
+
+def reset_rate_limits():
+    # Empties every bucket, mainly so tests start from a clean slate
+    get_store().clear()
+
+
+def is_rate_limited(request, scope):
+    """
+    Takes a token from each bucket configured for the scope, in order. Returns the
+    period in seconds of the first exhausted limit, or None if the request is allowed.
+    The buckets after an exhausted one aren't charged for a request that is refused.
+    """
+    store = get_store()
+    for kind, rate in settings.RATE_LIMITS.get(scope, {}).items():
+        capacity, period = parse_rate(rate)
+        key = f"{scope}:{kind}:{KEY_FUNCTIONS[kind](request)}"
+        if not store.consume(key, capacity, period):
+            return period
+    return None
+
+
+def rate_limit(scope):
+    """
+    View decorator that rejects POSTs with a 429 once any of the limits configured
+    in settings.RATE_LIMITS[scope] has been exceeded. GET requests are not limited.
+    Works on both sync and async views.
+    """
+    def rejection(request):
+        # Returns a 429 response if the request is over a limit, otherwise None
+        if request.method == "POST":
+            retry_after = is_rate_limited(request, scope)
+            if retry_after is not None:
+                response = HttpResponse(TOO_MANY_REQUESTS_ERROR, status=429)
+                response["Retry-After"] = str(retry_after)
+                return response
+        return None
+
+    async def async_rejection(request):
+        # The shared cache is reached with blocking calls, which mustn't run on the event
+        # loop; the in-process buckets are only a dict lookup, so they stay on it
+        if request.method == "POST" and isinstance(get_store(), CacheWindowStore):
+            return await sync_to_async(rejection)(request)
+        return rejection(request)
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapped_view(request, *args, **kwargs):
+                return await async_rejection(request) or await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def wrapped_view(request, *args, **kwargs):
+                return rejection(request) or view_func(request, *args, **kwargs)
+        return wrapped_view
+    return decorator
@@ -0,0 +1,43 @@
+# Third-party
+from asgiref.local import Local  # Per-request state that follows a request across threads and tasks
+
+# Django
+from django.core.signals import request_started  # Sent at the start of each request
+from django.db import connections  # Tells whether a transaction is open on the primary
+from django.dispatch import receiver  # Decorator for connecting signal handlers
+
+# Whether the current request has written to the database
+_state = Local()
+
+
+@receiver(request_started)
+def _reset_for_new_request(**kwargs):
+    _state.wrote = False
+
+
+class ReadWriteRouter:
+    """
+    Sends writes to the "default" alias and reads to "replica", a read-only connection to
+    the same SQLite file. Replica connections can't take the write lock or write by mistake,
+    and in WAL mode they see every committed write at once.
+
+    Reads go to "default" instead while a transaction is open there, since its changes are
+    not committed yet, and for the rest of a request once it has written anything, so the
+    request always reads its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, "wrote", False) or connections["default"].in_atomic_block:
+            return "default"
+        return "replica"
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,7 +35,8 @@ if "DJANGO_DEBUG_FALSE" in os.environ:
         'superlists.dalesingh.co.uk',
         'staging.superlists.dalesingh.co.uk',
         ]
-    db_path = os.environ["DJANGO_DB_PATH"]
+    # Only used when the database engine is SQLite (see DATABASES below)
+    db_path = os.environ.get("DJANGO_DB_PATH")
 
     # CSRF settings for production - support both HTTP and HTTPS
     CSRF_TRUSTED_ORIGINS = [
@@ -107,11 +110,20 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 MIDDLEWARE = [
+    # Answers the /healthz and /readyz probes before sessions, CSRF or the host check
+    # get involved (see superlists/health.py)
+    'superlists.health.HealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # WhiteNoise middleware is added here to serve static files efficiently in production.
     # This ensures that static files (CSS, JavaScript) are served even when using Gunicorn,
     # since Gunicorn does not handle static files by default.
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # The subclass also runs in async mode, so requests under ASGI stay on the event loop.
+    'superlists.middleware.AsyncWhiteNoiseMiddleware',
+    # Brotli/gzip for everything else. Below WhiteNoise, so static files keep being
+    # served from the copies WhiteNoise compressed at build time.
+    'superlists.middleware.CompressionMiddleware',
+    # Link: rel=preload headers for the stylesheet and script every page needs
+    'superlists.middleware.PreloadLinksMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -120,12 +132,33 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Session storage backend, chosen with the DJANGO_SESSION_ENGINE environment variable:
+# - "db" (default) reads and writes the django_session table on every session access
+# - "cached_db" serves reads from the cache and only falls back to the database on a miss
+# - "signed_cookies" keeps the whole session in a signed cookie, so sessions never touch the database
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+_session_engine = os.environ.get("DJANGO_SESSION_ENGINE", "db")
+if _session_engine not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f"DJANGO_SESSION_ENGINE is {_session_engine!r}; use one of {', '.join(SESSION_ENGINES)}."
+    )
+SESSION_ENGINE = SESSION_ENGINES[_session_engine]
+
 ROOT_URLCONF = 'superlists.urls'
 
+# Output of `python manage.py build_css` (run by the Dockerfile): a purged Bootstrap stylesheet
+# and includes/stylesheets.html templates that inline its critical rules. Files here take
+# precedence over the defaults in lists/, which link the full stylesheet.
+BUILD_DIR = BASE_DIR / 'build'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BUILD_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -136,20 +169,171 @@ TEMPLATES = [
             ],
         },
     },
+    # Jinja2 renders the templates in <app>/jinja2/ listed in JINJA2_TEMPLATES below,
+    # which is much cheaper per loop iteration on long lists
+    {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [BUILD_DIR / 'jinja2'],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'superlists.jinja2.environment',
+            'context_processors': [
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
 ]
 
+# Templates rendered by Jinja2 instead of the Django template engine, as a comma-separated
+# list of names, e.g. DJANGO_JINJA2_TEMPLATES=list.html,includes/list_table.html
+# Each has an equivalent in lists/jinja2/, and pages rendered by Jinja2 extend its base.html
+JINJA2_TEMPLATES = {
+    name.strip() for name in os.environ.get('DJANGO_JINJA2_TEMPLATES', '').split(',') if name.strip()
+}
+
 WSGI_APPLICATION = 'superlists.wsgi.application'
+# Production serves the (async) views through superlists/asgi.py with Uvicorn workers
+ASGI_APPLICATION = 'superlists.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': db_path
+# The engine is chosen with DJANGO_DB_ENGINE: "sqlite" (default) or "postgresql".
+# SQLite allows a single writer and one container per volume, while PostgreSQL
+# lets several containers share one database so the app can scale horizontally.
+DB_ENGINE = os.environ.get("DJANGO_DB_ENGINE", "sqlite")
+
+# Databases that hold lists (see the SQLite settings below)
+LIST_SHARDS = ['default']
+
+# Seconds to keep a database connection open for later requests. 0 by default because the
+# site is served through ASGI, where Django runs each request in a context of its own, so
+# the next request never finds the previous one's connection and a kept connection is only
+# closed once it expires. Django's docs advise turning persistent connections off under
+# ASGI; set DJANGO_DB_CONN_MAX_AGE when serving through WSGI instead.
+DB_CONN_MAX_AGE = int(os.environ.get("DJANGO_DB_CONN_MAX_AGE", "0"))
+
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("DJANGO_DB_NAME", "superlists"),
+            'USER': os.environ.get("DJANGO_DB_USER", "superlists"),
+            'PASSWORD': os.environ.get("DJANGO_DB_PASSWORD", ""),
+            'HOST': os.environ.get("DJANGO_DB_HOST", "localhost"),
+            'PORT': os.environ.get("DJANGO_DB_PORT", "5432"),
+        }
+    }
+    if "DJANGO_DB_POOL_MAX_SIZE" in os.environ:
+        # psycopg3 connection pool shared by the threads of each worker process.
+        # Django requires CONN_MAX_AGE to stay at 0 when pooling is enabled.
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get("DJANGO_DB_POOL_MIN_SIZE", "1")),
+                'max_size': int(os.environ["DJANGO_DB_POOL_MAX_SIZE"]),
+            },
+        }
+    else:
+        # Without a pool, connections are only kept when DB_CONN_MAX_AGE asks for it,
+        # and then checked to be usable before reuse
+        DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    # Run on every new connection, i.e. on each request's first query under ASGI. They cost
+    # a few microseconds: journal_mode=WAL is stored in the file, so setting it again is a no-op
+    SQLITE_PRAGMAS = [
+        # Write-ahead logging: readers no longer block the writer or each other (stored in the file)
+        "PRAGMA journal_mode=WAL",
+        # Only sync the WAL at checkpoints. Safe from corruption in WAL mode; a power cut can lose
+        # the last few commits, but a crashed worker process cannot
+        "PRAGMA synchronous=NORMAL",
+        # Read the database through a memory map (up to 128 MB) instead of read() calls
+        "PRAGMA mmap_size=134217728",
+        # Page cache of about 20 MB per connection (negative values are in KiB)
+        "PRAGMA cache_size=-20000",
+    ]
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': db_path,
+            # See DB_CONN_MAX_AGE above: opening a SQLite file is cheap, so each request
+            # opening its own connection costs little
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Seconds to wait for another worker's write lock before "database is locked"
+                'timeout': int(os.environ.get("DJANGO_DB_BUSY_TIMEOUT", "5")),
+                # Take the write lock when a transaction starts. A transaction that reads and then
+                # tries to upgrade to a write can't wait for the lock (SQLite fails it at once to
+                # avoid deadlock), so concurrent writers would fail instead of queueing.
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': ";".join(SQLITE_PRAGMAS),
+            },
+        },
+        # The same file opened read-only (mode=ro) for queries that don't need the primary
+        # connection, used when DJANGO_DB_READ_REPLICA is set (see superlists/routers.py).
+        # query_only makes any write fail as well.
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f"{Path(db_path).absolute().as_uri()}?mode=ro" if db_path else None,
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': int(os.environ.get("DJANGO_DB_BUSY_TIMEOUT", "5")),
+                # journal_mode and synchronous are left to the read-write connections
+                'init_command': ";".join(
+                    ["PRAGMA query_only=ON"]
+                    + [pragma for pragma in SQLITE_PRAGMAS if "mmap_size" in pragma or "cache_size" in pragma]
+                ),
+            },
+            # Tests run against one in-memory database, which the replica alias shares
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+    # Opt-in sharding: DJANGO_LIST_SHARDS=3 spreads lists and their items over the default
+    # database and two more files next to it, lists-shard1.sqlite3 and lists-shard2.sqlite3,
+    # so writes to different lists don't all queue for one write lock (see lists/sharding.py).
+    # New lists stay in the default database until `./manage.py rebalance_list_shards`
+    # assigns buckets to the shards, and `./manage.py migrate_list_shards` creates their tables.
+    LIST_SHARDS = ['default']
+    for shard in range(1, int(os.environ.get("DJANGO_LIST_SHARDS", "1"))):
+        alias = f'shard{shard}'
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            'NAME': Path(db_path).with_name(f"lists-shard{shard}.sqlite3") if db_path else None,
+        }
+        LIST_SHARDS.append(alias)
+
+    DATABASE_ROUTERS = []
+    if len(LIST_SHARDS) > 1:
+        DATABASE_ROUTERS.append('lists.sharding.ShardRouter')
+    # WAL already lets readers run alongside the writer, so this is opt-in: it guarantees
+    # GET requests can't write or hold the write lock rather than making them faster
+    if "DJANGO_DB_READ_REPLICA" in os.environ:
+        DATABASE_ROUTERS.append('superlists.routers.ReadWriteRouter')
+
+# Opt-in group commit: DJANGO_GROUP_COMMIT_WINDOW_MS=5 makes item inserts that arrive within
+# 5 ms of each other in a worker share one transaction (see superlists/groupcommit.py)
+GROUP_COMMIT_WINDOW = float(os.environ.get("DJANGO_GROUP_COMMIT_WINDOW_MS", "0")) / 1000
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Setting DJANGO_CACHE_PATH stores the cache in one SQLite file shared by every gunicorn
+# worker in the container, instead of a separate in-memory cache per worker.
+if "DJANGO_CACHE_PATH" in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'superlists.cache.SQLiteCache',
+            'LOCATION': os.environ["DJANGO_CACHE_PATH"],
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get("DJANGO_CACHE_MAX_ENTRIES", "10000")),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -192,6 +376,19 @@ USE_TZ = True
 STATIC_URL = '/static/'
 # Specifies the directory where Django will collect all static files 
 STATIC_ROOT = BASE_DIR / 'static' 
+# Static files generated by build_css, only listed once they exist
+STATICFILES_DIRS = [BUILD_DIR / 'static'] if (BUILD_DIR / 'static').is_dir() else []
+
+# In production, collectstatic writes each file under a name containing a hash of its contents
+# (e.g. lists.3f2a9c.js) plus gzip and Brotli copies, and {% static %} links to the hashed names.
+# A changed file gets a new URL, so WhiteNoise can tell browsers to cache hashed files forever
+# ("immutable") and repeat visits fetch no assets. Development keeps the plain file names,
+# which need no collectstatic run.
+if not DEBUG:
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+    }
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -205,3 +402,23 @@ EMAIL_PORT = 2525
 EMAIL_HOST_USER = "apikey"
 EMAIL_HOST_PASSWORD = os.environ.get("SENDGRID_API_KEY")
 EMAIL_USE_TLS = True
+
+# When DJANGO_CACHEABLE_HOME_PAGE is set, anonymous visitors get a home page with no CSRF token
+# or session data and a public Cache-Control header, so it can be served from a shared cache.
+# lists.js fetches the CSRF token lazily from the "csrf" endpoint before the forms are submitted.
+CACHEABLE_HOME_PAGE = "DJANGO_CACHEABLE_HOME_PAGE" in os.environ
+HOME_PAGE_MAX_AGE = 60 * 60 * 24
+
+# How long a rendered list table stays in the cache. Entries never go stale, because
+# changing a list moves it to a new cache key, so this only bounds memory use.
+LIST_TABLE_CACHE_TIMEOUT = 60 * 60
+
+# Token-bucket rate limits applied by superlists.ratelimit.rate_limit to anonymous POST views.
+# Each scope maps a kind of key ("ip", "email" or "global") to a rate such as "10/m".
+RATE_LIMITS = {
+    "send_login_email": {"ip": "10/m", "email": "10/h", "global": "300/m"},
+    "new_list": {"ip": "60/m", "global": "1200/m"},
+}
+# Name of a shared cache alias (e.g. memcached) used to enforce limits across workers.
+# When unset, each worker keeps its own in-memory buckets.
+RATE_LIMIT_CACHE = os.environ.get("DJANGO_RATE_LIMIT_CACHE")
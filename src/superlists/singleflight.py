@@ -0,0 +1,88 @@
+# Standard library
+import time  # Freshness timestamps and polling while another worker computes
+import uuid  # Identifies which caller holds a lock
+from functools import wraps  # Preserves the wrapped function's name and docstring
+
+# Django
+from django.core.cache import cache  # Stores results and the locks that coalesce recomputation
+
+# How often a caller waiting for another worker's result checks the cache
+POLL_INTERVAL = 0.02
+
+
+def single_flight(key, timeout, stale_timeout=0, lock_timeout=10, wait_timeout=5):
+    """
+    Caches a function's result and makes sure only one caller at a time recomputes it.
+
+    key(*args, **kwargs) builds the cache key for a call. A result is fresh for
+    `timeout` seconds, then may be served stale for another `stale_timeout`
+    seconds while a single caller recomputes it (stale-while-revalidate).
+
+    When there is no usable result, one caller takes a lock in the cache and
+    computes it while the others poll for it. The lock expires after `lock_timeout`
+    seconds in case its holder dies, and a caller that has waited `wait_timeout`
+    seconds gives up and computes the result itself. With a cache shared between
+    workers (see superlists.cache) this coalesces work across the whole container.
+    """
+    def decorator(func):
+        def compute_and_store(cache_key, args, kwargs):
+            value = func(*args, **kwargs)
+            cache.set(
+                cache_key,
+                (value, time.time() + timeout),
+                timeout=timeout + stale_timeout,
+            )
+            return value
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = f"single-flight:{key(*args, **kwargs)}"
+            lock_key = f"{cache_key}:lock"
+
+            entry = cache.get(cache_key)
+            if entry is not None:
+                value, fresh_until = entry
+                if time.time() < fresh_until:
+                    return value
+                # Stale: refresh it if nobody else is, and otherwise serve the stale copy
+                with _Lock(lock_key, lock_timeout) as acquired:
+                    if acquired:
+                        return compute_and_store(cache_key, args, kwargs)
+                return value
+
+            deadline = time.time() + wait_timeout
+            while True:
+                with _Lock(lock_key, lock_timeout) as acquired:
+                    if acquired:
+                        return compute_and_store(cache_key, args, kwargs)
+                time.sleep(POLL_INTERVAL)
+                entry = cache.get(cache_key)
+                if entry is not None:
+                    return entry[0]
+                if time.time() > deadline:
+                    # The lock holder is too slow (or has died), so stop waiting for it
+                    return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+class _Lock:
+    """
+    A best-effort lock held in the cache, taken with the atomic cache.add().
+    """
+
+    def __init__(self, key, timeout):
+        self.key = key
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+        self.acquired = False
+
+    def __enter__(self):
+        self.acquired = cache.add(self.key, self.token, timeout=self.timeout)
+        return self.acquired
+
+    def __exit__(self, *exc_info):
+        # Only release the lock if it is still ours rather than one taken after ours expired
+        if self.acquired and cache.get(self.key) == self.token:
+            cache.delete(self.key)
@@ -0,0 +1,64 @@
+# Standard library
+from unittest import mock  # Replaces send_mail so no email is sent
+
+# Django
+from django.core import mail  # Access Django's test email outbox
+from django.test import TestCase  # Base test case class for writing unit tests
+
+# Local application
+from accounts.models import Token, User
+from lists.models import Item, List
+from superlists.middleware import AsyncWhiteNoiseMiddleware  # Static file middleware that supports async
+
+
+# Runs the views through Django's async request handler, as the ASGI server does.
+# Any synchronous ORM access left in an async view would raise SynchronousOnlyOperation here.
+class AsyncViewsTest(TestCase):
+    async def test_home_page(self):
+        response = await self.async_client.get("/")
+        self.assertTemplateUsed(response, "home.html")
+
+    async def test_can_create_a_list_and_add_to_it(self):
+        response = await self.async_client.post("/lists/new", data={"text": "first item"})
+        new_list = await List.objects.aget()
+        self.assertRedirects(response, f"/lists/{new_list.id}/", fetch_redirect_response=False)
+
+        await self.async_client.post(f"/lists/{new_list.id}/", data={"text": "second item"})
+        response = await self.async_client.get(f"/lists/{new_list.id}/")
+        self.assertContains(response, "1: first item")
+        self.assertContains(response, "2: second item")
+
+    async def test_duplicate_items_are_rejected(self):
+        our_list = await List.objects.acreate()
+        await Item.objects.acreate(list=our_list, text="textey")
+        response = await self.async_client.post(f"/lists/{our_list.id}/", data={"text": "textey"})
+        self.assertContains(response, "already got this in your list")
+
+    async def test_my_lists_for_a_logged_in_user(self):
+        user = await User.objects.acreate(email="a@b.com")
+        await self.async_client.aforce_login(user)
+        await self.async_client.post("/lists/new", data={"text": "owned item"})
+        response = await self.async_client.get("/lists/users/a@b.com/")
+        self.assertContains(response, "owned item")
+
+    async def test_login_email_and_magic_link(self):
+        await self.async_client.post("/accounts/send_login_email", data={"email": "edith@example.com"})
+        self.assertEqual(mail.outbox[-1].to, ["edith@example.com"])
+        token = await Token.objects.aget()
+        await self.async_client.get(f"/accounts/login?token={token.uid}")
+        response = await self.async_client.get("/")
+        self.assertEqual(response.context["user"].email, "edith@example.com")
+
+
+# Tests for the async-capable WhiteNoise middleware
+class AsyncWhiteNoiseMiddlewareTest(TestCase):
+    async def test_passes_other_requests_to_the_next_async_handler(self):
+        async def get_response(request):
+            return "response"
+        middleware = AsyncWhiteNoiseMiddleware(get_response)
+        request = mock.Mock(path_info="/not-a-static-file")
+        self.assertEqual(await middleware(request), "response")
+
+    def test_stays_synchronous_in_a_sync_stack(self):
+        middleware = AsyncWhiteNoiseMiddleware(lambda request: "response")
+        self.assertEqual(middleware(mock.Mock(path_info="/not-a-static-file")), "response")
@@ -0,0 +1,85 @@
+# Standard library
+import tempfile  # Temporary directory for each test's cache file
+import time  # Used to wait for entries to expire
+
+# Django
+from django.test import SimpleTestCase  # Base test case for tests that don't need the database
+
+# Local application
+from superlists.cache import SQLiteCache  # The shared cache backend under test
+
+
+# Tests for the SQLite file cache backend
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(f"{self.directory.name}/cache.sqlite3", {"OPTIONS": options})
+
+    def test_stores_and_returns_values(self):
+        self.cache.set("key", {"some": ["value"]})
+        self.assertEqual(self.cache.get("key"), {"some": ["value"]})
+        self.assertIsNone(self.cache.get("missing"))
+        self.assertEqual(self.cache.get("missing", "default"), "default")
+
+    def test_entries_are_shared_between_instances(self):
+        # Each worker process has its own backend instance pointing at the same file
+        self.cache.set("key", "value")
+        self.assertEqual(self.make_cache().get("key"), "value")
+
+    def test_entries_expire(self):
+        self.cache.set("key", "value", timeout=0.1)
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertFalse(self.cache.has_key("key"))
+
+    def test_add_only_sets_missing_or_expired_keys(self):
+        self.assertTrue(self.cache.add("key", "first"))
+        self.assertFalse(self.cache.add("key", "second"))
+        self.assertEqual(self.cache.get("key"), "first")
+        self.cache.set("expiring", "old", timeout=0.1)
+        time.sleep(0.2)
+        self.assertTrue(self.cache.add("expiring", "new"))
+        self.assertEqual(self.cache.get("expiring"), "new")
+
+    def test_incr_is_atomic_and_requires_an_existing_key(self):
+        self.cache.set("counter", 1)
+        self.assertEqual(self.cache.incr("counter"), 2)
+        self.assertEqual(self.make_cache().incr("counter", 10), 12)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_get_or_set_uses_the_default_once(self):
+        self.assertEqual(self.cache.get_or_set("key", lambda: "computed"), "computed")
+        self.assertEqual(self.cache.get_or_set("key", lambda: "recomputed"), "computed")
+
+    def test_delete_touch_and_clear(self):
+        self.cache.set("key", "value", timeout=0.1)
+        self.assertTrue(self.cache.touch("key", timeout=None))
+        time.sleep(0.2)
+        self.assertEqual(self.cache.get("key"), "value")
+        self.assertTrue(self.cache.delete("key"))
+        self.assertFalse(self.cache.delete("key"))
+        self.cache.set("other", "value")
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("other"))
+
+    def test_culls_least_recently_used_entries_over_max_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache.set("d", "d")
+        # Four entries is over the cap, so the least recently used half ("a" and "b") is dropped
+        self.assertEqual(cache.get_many(["a", "b", "c", "d"]), {"c": "c", "d": "d"})
+
+    def test_counts_entries_once_every_hundredth_of_max_entries_writes(self):
+        cache = self.make_cache(MAX_ENTRIES=1000)
+        statements = []
+        cache._connection().set_trace_callback(statements.append)
+        for number in range(25):
+            cache.set(f"key{number}", number)
+        self.assertEqual(sum("COUNT(*)" in statement for statement in statements), 2)
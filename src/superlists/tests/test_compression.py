@@ -0,0 +1,183 @@
+# Standard library
+import gzip  # Decompresses gzipped responses
+from io import BytesIO  # Reads a single gzipped chunk
+
+# Third-party
+import brotli  # Decompresses Brotli responses
+
+# Django
+from django.http import HttpResponse, StreamingHttpResponse  # Responses to compress
+from django.test import RequestFactory, SimpleTestCase, TestCase  # Test cases and fake requests
+
+# Local application
+from superlists.middleware import (
+    CompressionMiddleware,
+    EarlyHintsMiddleware,
+    PreloadLinksMiddleware,
+    accepted_encoding,
+)
+
+PAGE = b"<html><body>" + b"<li>To-do item</li>" * 50 + b"</body></html>"
+
+
+class AcceptedEncodingTest(SimpleTestCase):
+    def test_prefers_brotli(self):
+        self.assertEqual(accepted_encoding("gzip, deflate, br"), "br")
+
+    def test_falls_back_to_gzip(self):
+        self.assertEqual(accepted_encoding("gzip, deflate"), "gzip")
+
+    def test_codings_with_zero_quality_are_refused(self):
+        self.assertEqual(accepted_encoding("br;q=0, gzip;q=0.5"), "gzip")
+        self.assertIsNone(accepted_encoding("gzip;q=0"))
+
+    def test_wildcard_covers_unlisted_codings(self):
+        self.assertEqual(accepted_encoding("*"), "br")
+        self.assertEqual(accepted_encoding("br;q=0, *"), "gzip")
+
+    def test_nothing_accepted(self):
+        self.assertIsNone(accepted_encoding(""))
+        self.assertIsNone(accepted_encoding("identity"))
+
+
+class CompressionMiddlewareTest(SimpleTestCase):
+    def compress(self, response, accept_encoding="gzip, br"):
+        request = RequestFactory().get("/", headers={"accept-encoding": accept_encoding})
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_pages_with_brotli(self):
+        response = self.compress(HttpResponse(PAGE))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), PAGE)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_compresses_pages_with_gzip(self):
+        response = self.compress(HttpResponse(PAGE), accept_encoding="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), PAGE)
+
+    def test_pads_gzipped_pages(self):
+        # The random file name in the header varies the length of identical pages
+        lengths = {
+            len(self.compress(HttpResponse(PAGE), accept_encoding="gzip").content) for _ in range(10)
+        }
+        self.assertGreater(len(lengths), 1)
+
+    def test_leaves_pages_alone_for_clients_without_compression(self):
+        response = self.compress(HttpResponse(PAGE), accept_encoding="")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, PAGE)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_skips_tiny_responses(self):
+        response = self.compress(HttpResponse(b"<p>hi</p>"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, b"<p>hi</p>")
+
+    def test_skips_compressed_responses(self):
+        response = HttpResponse(gzip.compress(PAGE), headers={"Content-Encoding": "gzip"})
+        self.assertEqual(self.compress(response)["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), PAGE)
+
+    def test_skips_content_that_isnt_text(self):
+        response = self.compress(HttpResponse(PAGE, content_type="image/png"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_skips_no_transform_responses(self):
+        response = self.compress(HttpResponse(PAGE, headers={"Cache-Control": "no-transform"}))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_weakens_strong_etags(self):
+        response = self.compress(HttpResponse(PAGE, headers={"ETag": '"abc"'}))
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def test_compresses_streaming_responses(self):
+        response = self.compress(StreamingHttpResponse(iter([PAGE, b"", PAGE])))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(brotli.decompress(b"".join(response.streaming_content)), PAGE * 2)
+
+    def test_flushes_each_streamed_chunk(self):
+        response = self.compress(StreamingHttpResponse(iter([PAGE, PAGE])), accept_encoding="gzip")
+        first_chunk = next(iter(response.streaming_content))
+        # The first chunk decompresses on its own, so the browser can show it straight away
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(first_chunk)).read1(), PAGE)
+
+    def test_pads_streamed_gzip(self):
+        bodies = [
+            b"".join(self.compress(StreamingHttpResponse(iter([PAGE, PAGE])), accept_encoding="gzip"))
+            for _ in range(10)
+        ]
+        self.assertEqual({gzip.decompress(body) for body in bodies}, {PAGE * 2})
+        self.assertGreater(len({len(body) for body in bodies}), 1)
+
+
+class AsyncCompressionMiddlewareTest(TestCase):
+    async def test_compresses_async_streaming_responses(self):
+        async def chunks():
+            yield PAGE
+            yield PAGE
+
+        async def get_response(request):
+            return StreamingHttpResponse(chunks())
+
+        request = RequestFactory().get("/", headers={"accept-encoding": "gzip"})
+        response = await CompressionMiddleware(get_response)(request)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body), PAGE * 2)
+
+    async def test_pages_are_compressed_end_to_end(self):
+        response = await self.async_client.get("/", headers={"accept-encoding": "br"})
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIn(b"To-Do", brotli.decompress(response.content))
+
+
+class PreloadLinksTest(TestCase):
+    def test_pages_name_the_critical_static_files(self):
+        response = self.client.get("/")
+        self.assertEqual(
+            response["Link"],
+            "</static/bootstrap/css/bootstrap.min.css>; rel=preload; as=style, "
+            "</static/lists.js>; rel=preload; as=script",
+        )
+
+    def test_only_pages_get_the_header(self):
+        middleware = PreloadLinksMiddleware(lambda request: HttpResponse("{}", content_type="application/json"))
+        self.assertFalse(middleware(RequestFactory().get("/")).has_header("Link"))
+
+
+class EarlyHintsMiddlewareTest(SimpleTestCase):
+    async def call(self, extensions, path="/", accept=b"text/html"):
+        sent = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start"})
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "headers": [(b"accept", accept)],
+            "extensions": extensions,
+        }
+        await EarlyHintsMiddleware(app)(scope, None, send)
+        return sent
+
+    async def test_sends_early_hints_before_the_response(self):
+        sent = await self.call({"http.response.early_hint": {}})
+        self.assertEqual(sent[0]["type"], "http.response.early_hint")
+        self.assertIn(b"</static/lists.js>; rel=preload; as=script", sent[0]["links"])
+        self.assertEqual(sent[1]["type"], "http.response.start")
+
+    async def test_not_sent_when_the_server_cant(self):
+        sent = await self.call({})
+        self.assertEqual([message["type"] for message in sent], ["http.response.start"])
+
+    async def test_not_sent_for_static_files_or_other_content(self):
+        self.assertEqual(len(await self.call({"http.response.early_hint": {}}, path="/static/lists.js")), 1)
+        self.assertEqual(len(await self.call({"http.response.early_hint": {}}, accept=b"application/json")), 1)
@@ -0,0 +1,42 @@
+# Standard library
+import tempfile  # Holds a throwaway on-disk database
+from pathlib import Path  # Builds the database file path
+
+# Django
+from django.db import connection  # The default database connection
+from django.db.backends.sqlite3.base import DatabaseWrapper  # Opens a second SQLite connection
+from django.test import TestCase  # Base test case class for writing unit tests
+
+
+# Tests for the SQLite connection settings
+class SQLiteSettingsTest(TestCase):
+    def pragma(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_connections(self):
+        self.assertEqual(self.pragma(connection, "synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma(connection, "cache_size"), -20000)
+
+    def test_write_transactions_take_the_lock_immediately(self):
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+    def test_waits_for_locks(self):
+        self.assertEqual(connection.get_connection_params()["timeout"], 5)
+
+    def test_connections_are_not_kept_under_asgi(self):
+        # Each ASGI request runs in its own context and would never reuse a kept connection
+        self.assertEqual(connection.settings_dict["CONN_MAX_AGE"], 0)
+
+    def test_database_files_use_write_ahead_logging(self):
+        # The test database lives in memory, which has no journal, so open a file instead
+        with tempfile.TemporaryDirectory() as directory:
+            file_connection = DatabaseWrapper(
+                {**connection.settings_dict, "NAME": str(Path(directory) / "db.sqlite3")}
+            )
+            try:
+                self.assertEqual(self.pragma(file_connection, "journal_mode"), "wal")
+                self.assertEqual(self.pragma(file_connection, "mmap_size"), 134217728)
+            finally:
+                file_connection.close()
@@ -0,0 +1,73 @@
+# Standard library
+import asyncio  # Issues concurrent writes
+from unittest import mock  # Counts and fails transactions
+
+# Django
+from django.db import IntegrityError, OperationalError  # Errors raised by failing writes
+from django.test import TestCase, override_settings  # Base test case and settings overrides
+
+# Local application
+from lists.models import Item, List
+from superlists import groupcommit  # Batches concurrent inserts into one transaction
+
+
+class GroupCommitDisabledTest(TestCase):
+    async def test_runs_each_operation_on_its_own(self):
+        our_list = await List.objects.acreate()
+        with mock.patch("superlists.groupcommit._commit") as mock_commit:
+            item = await groupcommit.group_commit(lambda: Item.objects.create(list=our_list, text="a"))
+        mock_commit.assert_not_called()
+        self.assertEqual(await Item.objects.aget(), item)
+
+
+@override_settings(GROUP_COMMIT_WINDOW=0.005)
+class GroupCommitTest(TestCase):
+    def setUp(self):
+        self.list = List.objects.create()
+
+    def insert(self, text):
+        return lambda: Item.objects.create(list=self.list, text=text)
+
+    async def test_concurrent_writes_share_one_transaction(self):
+        with mock.patch("superlists.groupcommit._commit", wraps=groupcommit._commit) as mock_commit:
+            items = await asyncio.gather(*(groupcommit.group_commit(self.insert(t)) for t in "abc"))
+        self.assertEqual(mock_commit.call_count, 1)
+        self.assertEqual([item.text for item in items], ["a", "b", "c"])
+        self.assertEqual(await Item.objects.acount(), 3)
+
+    async def test_writes_to_different_databases_are_batched_apart(self):
+        with mock.patch("superlists.groupcommit._commit", wraps=groupcommit._commit) as mock_commit:
+            await asyncio.gather(
+                groupcommit.group_commit(self.insert("a"), using="default"),
+                groupcommit.group_commit(self.insert("b"), using="default"),
+                groupcommit.group_commit(self.insert("c")),
+            )
+        batch_sizes = {call.args[1]: len(call.args[0]) for call in mock_commit.call_args_list}
+        self.assertEqual(batch_sizes, {"default": 2, None: 1})
+
+    async def test_later_writes_start_a_new_batch(self):
+        with mock.patch("superlists.groupcommit._commit", wraps=groupcommit._commit) as mock_commit:
+            await groupcommit.group_commit(self.insert("a"))
+            await groupcommit.group_commit(self.insert("b"))
+        self.assertEqual(mock_commit.call_count, 2)
+
+    async def test_a_failing_write_only_fails_its_own_caller(self):
+        results = await asyncio.gather(
+            groupcommit.group_commit(self.insert("a")),
+            groupcommit.group_commit(self.insert("a")),
+            groupcommit.group_commit(self.insert("b")),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(results[1], IntegrityError)
+        self.assertEqual(results[0].text, "a")
+        self.assertEqual(results[2].text, "b")
+        self.assertEqual(await Item.objects.acount(), 2)
+
+    async def test_a_failed_transaction_fails_every_caller(self):
+        with mock.patch("superlists.groupcommit._commit", side_effect=OperationalError("database is locked")):
+            results = await asyncio.gather(
+                groupcommit.group_commit(self.insert("a")),
+                groupcommit.group_commit(self.insert("b")),
+                return_exceptions=True,
+            )
+        self.assertTrue(all(isinstance(result, OperationalError) for result in results))
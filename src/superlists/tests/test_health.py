@@ -0,0 +1,74 @@
+# Standard library
+from unittest import mock  # Breaks the checks and replaces the warm-up steps
+
+# Django
+from django.test import TestCase, override_settings  # Test cases and settings overrides
+
+# Local application
+from superlists import health, warmup  # The probes, and the warm-up they run
+
+
+class HealthCheckTest(TestCase):
+    # The readiness check queries every configured database
+    databases = "__all__"
+
+    def test_liveness_touches_nothing(self):
+        with self.assertNumQueries(0):
+            response = self.client.get("/healthz")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"ok")
+        self.assertEqual(response["Cache-Control"], "no-store")
+
+    def test_ready_when_databases_and_caches_answer(self):
+        response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ready": True, "checks": {"databases": "ok", "caches": "ok"}})
+
+    def test_not_ready_when_a_check_fails(self):
+        with mock.patch.object(health, "check_databases", side_effect=RuntimeError("locked")):
+            response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["checks"]["databases"], "RuntimeError: locked")
+
+    def test_probes_set_no_cookies(self):
+        # No session, CSRF or messages cookies: those middleware never see the request
+        for path in ("/healthz", "/readyz"):
+            self.assertEqual(self.client.get(path).cookies, {})
+
+    @override_settings(ALLOWED_HOSTS=["superlists.example.com"])
+    def test_probes_answer_on_any_host(self):
+        self.assertEqual(self.client.get("/readyz", headers={"host": "127.0.0.1:8001"}).status_code, 200)
+
+    async def test_probes_under_asgi(self):
+        self.assertEqual((await self.async_client.get("/healthz")).status_code, 200)
+        self.assertEqual((await self.async_client.get("/readyz")).status_code, 200)
+
+
+class ReadinessWarmUpTest(TestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        patcher = mock.patch.dict(warmup._warmed, {"done": False})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_check_warms_the_worker(self):
+        with mock.patch.object(warmup, "warm_templates") as warm_templates:
+            health.readiness()
+            health.readiness()
+        warm_templates.assert_called_once_with()
+        self.assertTrue(warmup.is_warm())
+
+    def test_a_failed_warm_up_is_retried(self):
+        with mock.patch.object(warmup, "warm_caches", side_effect=ValueError("Missing manifest")):
+            is_ready, results = health.readiness()
+        self.assertFalse(is_ready)
+        self.assertEqual(results["warm-up"], "ValueError: Missing manifest")
+        self.assertFalse(warmup.is_warm())
+        self.assertEqual(health.readiness(), (True, {"warm-up": "ok", "databases": "ok", "caches": "ok"}))
+
+    def test_workers_warmed_on_start_are_not_warmed_again(self):
+        warmup.warm_up()
+        with mock.patch.object(warmup, "warm_templates") as warm_templates:
+            health.readiness()
+        warm_templates.assert_not_called()
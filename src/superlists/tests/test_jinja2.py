@@ -0,0 +1,23 @@
+# Django
+from django.test import SimpleTestCase, override_settings  # Test case without a database, and settings overrides
+from django.template.loader import render_to_string  # Renders a template with a chosen engine
+
+# Local application
+from superlists.jinja2 import engine_for  # Picks the Django or Jinja2 engine for each template
+
+
+class EngineForTest(SimpleTestCase):
+    @override_settings(JINJA2_TEMPLATES={"list.html"})
+    def test_only_listed_templates_use_jinja2(self):
+        self.assertEqual(engine_for("list.html"), "jinja2")
+        self.assertEqual(engine_for("home.html"), "django")
+
+    @override_settings(JINJA2_TEMPLATES=set())
+    def test_django_engine_by_default(self):
+        self.assertEqual(engine_for("list.html"), "django")
+
+
+class EnvironmentTest(SimpleTestCase):
+    def test_templates_can_reverse_urls(self):
+        html = render_to_string("includes/scripts.html", using="jinja2")
+        self.assertIn('fillDeferredCsrfTokens("/csrf")', html)
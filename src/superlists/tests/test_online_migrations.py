@@ -0,0 +1,146 @@
+# Django
+from django.db import connection, migrations, models, transaction  # Schema editing and the operations wrapped
+from django.db.migrations.state import ProjectState  # Builds model states without a real app
+from django.test import TransactionTestCase  # Online rebuilds commit as they go, so no wrapping transaction
+
+# Local application
+from superlists.online_migrations import RebuildTableOnline, online_migration_options
+
+APP = "online_test"
+TABLE = "online_test_entry"
+
+
+class RebuildTableOnlineTest(TransactionTestCase):
+    def setUp(self):
+        self.state = ProjectState()
+        migrations.CreateModel(
+            "Entry",
+            fields=[
+                ("id", models.AutoField(primary_key=True)),
+                ("text", models.TextField()),
+            ],
+        ).state_forwards(APP, self.state)
+        with connection.schema_editor(atomic=False) as editor:
+            editor.create_model(self.state.apps.get_model(APP, "entry"))
+        self.addCleanup(self.drop_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (id, text) VALUES (%s, %s)",
+                [(n, f"entry {n}") for n in range(1, 6)],
+            )
+
+    def drop_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def apply(self, operation, backwards=False, **options):
+        new_state = self.state.clone()
+        operation.state_forwards(APP, new_state)
+        with online_migration_options(**options), connection.schema_editor(atomic=False) as editor:
+            if backwards:
+                operation.database_backwards(APP, editor, new_state, self.state)
+            else:
+                operation.database_forwards(APP, editor, self.state, new_state)
+        return new_state
+
+    def rows(self, columns="id, text"):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {columns} FROM {TABLE} ORDER BY id")
+            return cursor.fetchall()
+
+    def schema_objects(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT type, name FROM sqlite_master WHERE tbl_name LIKE 'online_test%%'")
+            return set(cursor.fetchall())
+
+    def test_adds_a_field_and_an_index_keeping_the_rows(self):
+        self.apply(RebuildTableOnline("entry", [
+            migrations.AddField("entry", "done", models.BooleanField(default=False)),
+            migrations.AddIndex("entry", models.Index(fields=["text"], name="entry_text_idx")),
+        ]))
+
+        self.assertEqual(self.rows("id, text, done"), [(n, f"entry {n}", 0) for n in range(1, 6)])
+        self.assertIn(("index", "entry_text_idx"), self.schema_objects())
+
+    def test_leaves_no_shadow_table_or_triggers_behind(self):
+        self.apply(RebuildTableOnline("entry", [
+            migrations.AddField("entry", "done", models.BooleanField(default=False)),
+        ]))
+        self.assertEqual({name for kind, name in self.schema_objects() if kind != "index"}, {TABLE})
+
+    def test_copies_in_batches_and_reports_progress(self):
+        reports = []
+        self.apply(
+            RebuildTableOnline("entry", [
+                migrations.AddField("entry", "done", models.BooleanField(default=False)),
+            ]),
+            batch_size=2,
+            pause=0,
+            report=reports.append,
+        )
+        self.assertEqual(reports[0], f"Copying 5 rows of {TABLE} in batches of 2")
+        self.assertIn("  2/5 rows (40%)", reports[1])
+        self.assertIn("  5/5 rows (100%)", reports[3])
+        self.assertEqual(reports[-1], f"Swapped in the rebuilt {TABLE}")
+
+    def test_writes_made_during_the_copy_are_kept(self):
+        def write_between_batches(message):
+            if "2/5 rows" in message:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"UPDATE {TABLE} SET text = 'changed' WHERE id IN (1, 5)")
+                    cursor.execute(f"DELETE FROM {TABLE} WHERE id = 4")
+                    cursor.execute(f"INSERT INTO {TABLE} (id, text) VALUES (6, 'new')")
+
+        self.apply(
+            RebuildTableOnline("entry", [
+                migrations.AddField("entry", "done", models.BooleanField(default=False)),
+            ]),
+            batch_size=2,
+            pause=0,
+            report=write_between_batches,
+        )
+
+        self.assertEqual(
+            self.rows(),
+            [(1, "changed"), (2, "entry 2"), (3, "entry 3"), (5, "changed"), (6, "new")],
+        )
+
+    def test_renamed_fields_keep_their_values(self):
+        self.apply(RebuildTableOnline("entry", [migrations.RenameField("entry", "text", "body")]))
+        self.assertEqual(self.rows("id, body")[0], (1, "entry 1"))
+
+    def test_can_be_reversed(self):
+        operation = RebuildTableOnline("entry", [
+            migrations.AddField("entry", "done", models.BooleanField(default=False)),
+        ])
+        self.apply(operation)
+        self.apply(operation, backwards=True)
+        self.assertEqual(self.rows("*"), [(n, f"entry {n}") for n in range(1, 6)])
+
+    def test_refuses_to_run_inside_a_transaction(self):
+        operation = RebuildTableOnline("entry", [
+            migrations.AddField("entry", "done", models.BooleanField(default=False)),
+        ])
+        with self.assertRaisesMessage(ValueError, "atomic = False"):
+            with transaction.atomic():
+                new_state = self.state.clone()
+                operation.state_forwards(APP, new_state)
+                editor = connection.schema_editor(atomic=False)
+                operation.database_forwards(APP, editor, self.state, new_state)
+
+    def test_sqlmigrate_shows_the_wrapped_operations(self):
+        operation = RebuildTableOnline("entry", [
+            migrations.AddIndex("entry", models.Index(fields=["text"], name="entry_text_idx")),
+        ])
+        new_state = self.state.clone()
+        operation.state_forwards(APP, new_state)
+        with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+            operation.database_forwards(APP, editor, self.state, new_state)
+        self.assertIn('CREATE INDEX "entry_text_idx"', "\n".join(editor.collected_sql))
+
+    def test_describes_the_wrapped_operations(self):
+        operation = RebuildTableOnline("entry", [
+            migrations.AddField("entry", "done", models.BooleanField(default=False)),
+        ])
+        self.assertEqual(operation.describe(), "Rebuild entry online: Add field done to entry")
+        self.assertEqual(operation.migration_name_fragment, "entry_done")
@@ -0,0 +1,133 @@
+# Standard library
+from unittest import mock  # Used to control the clock seen by the token buckets
+
+# Third-party
+from asgiref.sync import sync_to_async  # Watched to check where the cache is reached from
+
+# Django
+from django.core.cache import cache  # The shared cache the limits are kept in
+from django.db import connection  # Counts the queries a request makes
+from django.test import TestCase, override_settings  # Base test case and per-test settings overrides
+from django.test.utils import CaptureQueriesContext  # Records the queries an unlimited request makes
+
+# Local application
+from lists.models import List
+from superlists.ratelimit import (  # Rate limiting stores and helpers under test
+    LocalTokenBucketStore,
+    TOO_MANY_REQUESTS_ERROR,
+    parse_rate,
+    reset_rate_limits,
+)
+
+
+# Tests for the in-process token bucket store
+class LocalTokenBucketStoreTest(TestCase):
+    def test_parses_rates(self):
+        self.assertEqual(parse_rate("10/m"), (10, 60))
+        self.assertEqual(parse_rate("5/h"), (5, 3600))
+
+    def test_allows_up_to_capacity_then_refuses(self):
+        store = LocalTokenBucketStore()
+        results = [store.consume("key", 3, 60) for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+    def test_keys_have_separate_buckets(self):
+        store = LocalTokenBucketStore()
+        store.consume("a", 1, 60)
+        self.assertFalse(store.consume("a", 1, 60))
+        self.assertTrue(store.consume("b", 1, 60))
+
+    @mock.patch("superlists.ratelimit.time.monotonic")
+    def test_bucket_refills_over_time(self, mock_monotonic):
+        # An empty bucket regains one token after period / capacity seconds
+        store = LocalTokenBucketStore()
+        mock_monotonic.return_value = 100.0
+        store.consume("key", 2, 60)
+        store.consume("key", 2, 60)
+        self.assertFalse(store.consume("key", 2, 60))
+        mock_monotonic.return_value = 130.0
+        self.assertTrue(store.consume("key", 2, 60))
+
+
+# Tests for the shared-cache store, selected through RATE_LIMIT_CACHE
+@override_settings(
+    RATE_LIMIT_CACHE="default",
+    RATE_LIMITS={"new_list": {"ip": "2/m"}},
+)
+class CacheWindowStoreTest(TestCase):
+    def setUp(self):
+        reset_rate_limits()
+
+    def test_limits_are_enforced_through_the_cache(self):
+        for _ in range(2):
+            self.client.post("/lists/new", data={"text": "item"})
+        response = self.client.post("/lists/new", data={"text": "item"})
+        self.assertEqual(response.status_code, 429)
+
+    def test_reset_keeps_the_rest_of_the_cache(self):
+        for _ in range(3):
+            self.client.post("/lists/new", data={"text": "item"})
+        cache.set("unrelated", "kept")
+        reset_rate_limits()
+        self.assertEqual(cache.get("unrelated"), "kept")
+        response = self.client.post("/lists/new", data={"text": "item"})
+        self.assertEqual(response.status_code, 302)
+
+    @mock.patch("superlists.ratelimit.sync_to_async", wraps=sync_to_async)
+    async def test_async_views_reach_the_cache_from_a_thread(self, mock_sync_to_async):
+        response = await self.async_client.post("/lists/new", data={"text": "item"})
+        self.assertEqual(response.status_code, 302)
+        mock_sync_to_async.assert_called_once()
+
+
+# Tests for the rate_limit decorator as applied to the anonymous POST views
+class RateLimitedViewsTest(TestCase):
+    def setUp(self):
+        reset_rate_limits()
+
+    @override_settings(RATE_LIMITS={"new_list": {"ip": "2/m"}})
+    def test_new_list_returns_429_once_ip_limit_is_exhausted(self):
+        for _ in range(2):
+            response = self.client.post("/lists/new", data={"text": "item"})
+            self.assertEqual(response.status_code, 302)
+        response = self.client.post("/lists/new", data={"text": "item"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+        self.assertContains(response, TOO_MANY_REQUESTS_ERROR, status_code=429)
+        self.assertEqual(List.objects.count(), 2)
+
+    @override_settings(RATE_LIMITS={"send_login_email": {"email": "1/h"}})
+    def test_send_login_email_is_limited_per_email(self):
+        self.client.post("/accounts/send_login_email", data={"email": "edith@example.com"})
+        response = self.client.post("/accounts/send_login_email", data={"email": "EDITH@example.com"})
+        self.assertEqual(response.status_code, 429)
+        # A different address has its own bucket
+        response = self.client.post("/accounts/send_login_email", data={"email": "francis@example.com"})
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(RATE_LIMITS={"send_login_email": {"global": "1/m"}})
+    def test_global_limit_applies_across_clients(self):
+        self.client.post("/accounts/send_login_email", data={"email": "edith@example.com"}, REMOTE_ADDR="10.0.0.1")
+        response = self.client.post(
+            "/accounts/send_login_email", data={"email": "francis@example.com"}, REMOTE_ADDR="10.0.0.2"
+        )
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(RATE_LIMITS={"send_login_email": {"email": "1/h", "global": "2/m"}})
+    def test_refused_requests_arent_charged_to_later_limits(self):
+        # Edith's second and third requests stop at her own limit, leaving the global one alone
+        for _ in range(3):
+            self.client.post("/accounts/send_login_email", data={"email": "edith@example.com"})
+        response = self.client.post("/accounts/send_login_email", data={"email": "francis@example.com"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_does_not_write_to_the_database_when_checking(self):
+        # The only queries are the ones the view makes to create the list (which depend on
+        # whether lists are sharded), so a limited request makes as many as an unlimited one
+        with override_settings(RATE_LIMITS={}), CaptureQueriesContext(connection) as unlimited:
+            self.client.post("/lists/new", data={"text": "first"})
+        with override_settings(RATE_LIMITS={"new_list": {"ip": "1/m"}}):
+            with self.assertNumQueries(len(unlimited)):
+                self.client.post("/lists/new", data={"text": "item"})
+            with self.assertNumQueries(0):
+                self.client.post("/lists/new", data={"text": "item"})
@@ -0,0 +1,92 @@
+# Standard library
+import sqlite3  # Creates a database file for the read-only connection to open
+import tempfile  # Holds a throwaway on-disk database
+from pathlib import Path  # Builds the database file path
+from unittest import mock  # Simulates an open transaction
+
+# Django
+from django.core.signals import request_started  # Marks the start of a new request
+from django.db import OperationalError, connections  # Database connections and the error for refused writes
+from django.db.backends.sqlite3.base import DatabaseWrapper  # Opens a connection with the replica's options
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings  # Test cases
+from django.test.utils import CaptureQueriesContext  # Records the queries sent to a connection
+
+# Local application
+from lists.models import Item, List
+from superlists.routers import ReadWriteRouter  # Sends reads to the replica and writes to the primary
+
+
+class ReadWriteRouterTest(SimpleTestCase):
+    def setUp(self):
+        request_started.send(sender=self.__class__)
+        self.router = ReadWriteRouter()
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.router.db_for_read(Item), "replica")
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(self.router.db_for_write(Item), "default")
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        self.router.db_for_write(Item)
+        self.assertEqual(self.router.db_for_read(List), "default")
+
+    def test_each_request_starts_reading_from_the_replica(self):
+        self.router.db_for_write(Item)
+        request_started.send(sender=self.__class__)
+        self.assertEqual(self.router.db_for_read(Item), "replica")
+
+    def test_reads_inside_a_transaction_go_to_the_primary(self):
+        with mock.patch.object(connections["default"], "in_atomic_block", True):
+            self.assertEqual(self.router.db_for_read(Item), "default")
+
+    def test_only_migrates_the_primary(self):
+        self.assertTrue(self.router.allow_migrate("default", "lists"))
+        self.assertFalse(self.router.allow_migrate("replica", "lists"))
+
+
+class ReplicaConnectionTest(TestCase):
+    def test_replica_connections_cannot_write(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "db.sqlite3"
+            with sqlite3.connect(path) as setup:
+                setup.execute("CREATE TABLE t (x)")
+            replica_settings = connections["replica"].settings_dict
+            replica = DatabaseWrapper({**replica_settings, "NAME": f"{path.as_uri()}?mode=ro"})
+            try:
+                with replica.cursor() as cursor:
+                    cursor.execute("SELECT * FROM t")
+                    with self.assertRaises(OperationalError):
+                        cursor.execute("INSERT INTO t VALUES (1)")
+                    cursor.execute("PRAGMA query_only")
+                    self.assertEqual(cursor.fetchone()[0], 1)
+            finally:
+                replica.close()
+
+
+# Outside TestCase's wrapping transaction, so reads really are routed to the replica
+@override_settings(DATABASE_ROUTERS=["superlists.routers.ReadWriteRouter"])
+class ReadWriteRoutingViewsTest(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def test_get_requests_read_from_the_replica(self):
+        mylist = List.objects.create()
+        Item.objects.create(list=mylist, text="itemey")
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = self.client.get(f"/lists/{mylist.id}/")
+        self.assertContains(response, "1: itemey")
+        self.assertTrue(replica_queries.captured_queries)
+
+    def test_post_reads_its_own_write(self):
+        mylist = List.objects.create()
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = self.client.post(
+                f"/lists/{mylist.id}/",
+                data={"text": "itemey"},
+                headers={"x-requested-with": "XMLHttpRequest"},
+            )
+        # The row number is counted on the primary, after the insert
+        self.assertContains(response, "1: itemey", status_code=201)
+        self.assertFalse(
+            [q for q in replica_queries.captured_queries if "COUNT" in q["sql"]]
+        )
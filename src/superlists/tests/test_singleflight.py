@@ -0,0 +1,73 @@
+# Standard library
+import threading  # Simulates concurrent requests
+import time  # Used to let results go stale
+
+# Django
+from django.core.cache import cache  # The cache holding results and locks
+from django.test import SimpleTestCase  # Base test case for tests that don't need the database
+
+# Local application
+from superlists.singleflight import single_flight  # The coalescing decorator under test
+
+
+# Tests for the single_flight decorator
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def slow_function(self, delay=0.2, **options):
+        # Builds a decorated function that counts its calls and takes `delay` seconds
+        @single_flight(key=lambda name: name, **options)
+        def compute(name):
+            self.calls += 1
+            time.sleep(delay)
+            return f"{name} {self.calls}"
+        return compute
+
+    def run_concurrently(self, func, count=10):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(func("key"))) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_caches_results(self):
+        compute = self.slow_function(delay=0, timeout=60)
+        self.assertEqual(compute("key"), "key 1")
+        self.assertEqual(compute("key"), "key 1")
+        self.assertEqual(compute("other"), "other 2")
+
+    def test_concurrent_callers_share_one_computation(self):
+        compute = self.slow_function(timeout=60)
+        results = self.run_concurrently(compute)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["key 1"] * 10)
+
+    def test_stale_result_is_served_while_one_caller_revalidates(self):
+        compute = self.slow_function(timeout=0.1, stale_timeout=60)
+        compute("key")
+        time.sleep(0.2)
+        results = self.run_concurrently(compute)
+        # One caller recomputed and the rest were given the stale result straight away
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(sorted(results), ["key 1"] * 9 + ["key 2"])
+        self.assertEqual(compute("key"), "key 2")
+
+    def test_waiters_give_up_on_a_slow_lock_holder(self):
+        compute = self.slow_function(delay=0, timeout=60, wait_timeout=0.1)
+        # Another worker holds the lock but never stores a result
+        cache.add("single-flight:key:lock", "someone-else", timeout=60)
+        start = time.time()
+        self.assertEqual(compute("key"), "key 1")
+        self.assertLess(time.time() - start, 1)
+
+    def test_lock_is_released_if_the_computation_fails(self):
+        @single_flight(key=lambda: "failing", timeout=60)
+        def failing():
+            raise RuntimeError("boom")
+        with self.assertRaises(RuntimeError):
+            failing()
+        self.assertIsNone(cache.get("single-flight:failing:lock"))
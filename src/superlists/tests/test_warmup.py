@@ -0,0 +1,43 @@
+# Django
+from django.conf import settings  # Locates the project's template directories
+from django.template import engines  # Template engines whose caches are filled
+from django.test import TestCase  # Base test case class for writing unit tests
+
+# Local application
+from superlists import warmup  # Worker warm-up run from gunicorn.conf.py
+
+
+class WarmUpTest(TestCase):
+    def test_loads_the_project_templates_with_both_engines(self):
+        # lists/templates holds the Django templates and lists/jinja2 the Jinja2 ones, and
+        # build_css may have added overrides of both to BUILD_DIR
+        directories = [
+            settings.BASE_DIR / "lists" / "templates",
+            settings.BASE_DIR / "lists" / "jinja2",
+            settings.BUILD_DIR / "templates",
+            settings.BUILD_DIR / "jinja2",
+        ]
+        expected = sum(len(list(directory.glob("**/*.html"))) for directory in directories)
+        self.assertEqual(warmup.warm_templates(), expected)
+
+    def test_skips_templates_outside_the_project(self):
+        django_engine = engines["django"]
+        loaded = []
+        original = django_engine.get_template
+        django_engine.get_template = lambda name: loaded.append(name) or original(name)
+        try:
+            warmup.warm_templates()
+        finally:
+            del django_engine.get_template
+        self.assertIn("list.html", loaded)
+        self.assertNotIn("django/forms/default.html", loaded)
+
+    def test_populates_the_url_resolver(self):
+        self.assertGreater(warmup.warm_urls(), 0)
+
+    def test_loads_the_static_files_behind_the_preload_links(self):
+        self.assertEqual(warmup.warm_caches(), 2)
+
+    def test_reports_the_time_taken_by_each_step(self):
+        timings = warmup.warm_up()
+        self.assertEqual(set(timings), {"templates", "urls", "caches"})
@@ -8,6 +8,10 @@ from lists import views as list_views
 urlpatterns = [
     # The root URL is mapped to the home_page view and the pattern is called "home"
     path("", list_views.home_page, name="home"),
+    # Supplies CSRF tokens to pages that were served from a shared cache without one
+    path("csrf", list_views.csrf, name="csrf"),
+    # The service worker is served from the root so that it can control every page
+    path("sw.js", list_views.service_worker, name="service_worker"),
     # Any URL pattern matching lists/ is handled by lists.urls
     path("lists/", include("lists.urls")),
     # Any URL pattern matching accounts/ is handled by accounts.urls
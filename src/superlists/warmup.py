@@ -0,0 +1,90 @@
+# Standard library
+import time  # Measures how long each warm-up step takes
+from pathlib import Path  # Walks the template directories
+
+# Django
+from django.conf import settings  # Limits template warm-up to the project's own templates
+from django.core.cache import caches  # Caches to connect to ahead of the first request
+from django.template import engines  # Template engines whose caches are filled
+from django.urls import Resolver404, get_resolver  # The root URL resolver and its miss exception
+
+# Whether this process has been warmed up (by gunicorn.conf.py, or by the first readiness check)
+_warmed = {"done": False}
+
+
+def is_warm():
+    return _warmed["done"]
+
+
+def mark_warm():
+    _warmed["done"] = True
+
+
+def warm_templates():
+    """
+    Loads every template in the project's template directories through each engine,
+    so the cached loaders hold them compiled before the first request needs them.
+    """
+    count = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            directory = Path(directory)
+            # Skip templates that ship with Django and third-party packages
+            if not directory.is_relative_to(settings.BASE_DIR):
+                continue
+            for path in directory.rglob("*.html"):
+                engine.get_template(path.relative_to(directory).as_posix())
+                count += 1
+    return count
+
+
+def warm_urls():
+    """
+    Populates the URL resolver's reverse lookup tables and compiles every pattern's regex.
+    """
+    resolver = get_resolver()
+    resolver.reverse_dict  # Accessing this builds the lookup tables for every named URL
+    try:
+        # A path that matches nothing is tried against, and so compiles, every pattern
+        resolver.resolve("/__warm_up__/")
+    except Resolver404:
+        pass
+    return len([name for name in resolver.reverse_dict if isinstance(name, str)])
+
+
+def warm_caches():
+    """
+    Loads what each request would otherwise look up first: the list shard map and the
+    static files manifest behind the pages' preload links, both kept for the life of the
+    process. Reading each cache once also creates the SQLite cache's table.
+    """
+    # Imported here because lists imports this app's modules
+    from lists import sharding  # The bucket map, loaded from the database and the cache
+    from lists.assets import preload_links  # Static URLs, which load the manifest
+
+    for cache in caches.all():
+        cache.get("warm-up")
+    if sharding.is_enabled():
+        sharding.refresh_shard_map()
+    return len(preload_links())
+
+
+def warm_up():
+    """
+    Runs each warm-up step and returns a dict of step name -> seconds taken.
+
+    Database connections aren't opened here: under ASGI each request runs in a context
+    of its own and opens its own connection, so one opened ahead of time would never
+    be used.
+    """
+    timings = {}
+    for name, step in [
+        ("templates", warm_templates),
+        ("urls", warm_urls),
+        ("caches", warm_caches),
+    ]:
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    mark_warm()
+    return timings